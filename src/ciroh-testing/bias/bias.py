@@ -1,164 +1,385 @@
-from hydrotools.nwm_client import gcp as nwm
-from os import cpu_count
-from concurrent.futures import ProcessPoolExecutor
-import pandas as pd
-from datetime import datetime, timedelta
-import warnings
-
-from fpe_lite import admin, files
-
-def ht_dataframe_setup(
-    df, 
-    config, 
-    ht_service
-    ) -> pd.DataFrame:
-    '''
-    set up dataframe in hydrotools format
-    (cannot use hydrotools directly to fetch single timesteps of AnA, 
-    so copying some chunks of code needed)
-    '''
-
-    # Rename
-    df = df.rename(columns={'streamflow': 'value'})
-
-    # Reformat crosswalk
-    xwalk = ht_service.crosswalk
-
-    # Additional columns
-    xwalk['configuration'] = config
-    xwalk['measurement_unit'] = 'm3/s'
-    xwalk['variable_name'] = 'streamflow'
-
-    # Apply crosswalk metadata
-    for col in xwalk:
-        df[col] = df['nwm_feature_id'].map(xwalk[col])
-
-    # Categorize
-    df['configuration'] = df['configuration'].astype("category")
-    df['measurement_unit'] = df['measurement_unit'].astype("category")
-    df['variable_name'] = df['variable_name'].astype("category")
-    df['usgs_site_code'] = df['usgs_site_code'].astype("category")
-
-    # Sort values
-    df = df.sort_values(
-        by=['nwm_feature_id', 'value_time'],
-        ignore_index=True
-        )   
-    
-    return df
-    
-    
-def get_recent_ana(
-    specs,
-    ht_service,    
-    t0 = datetime(2020, 6, 2, 0),
-    bias_period = 10, 
-    no_da = False, 
-    df = pd.DataFrame()
-    ) -> pd.DataFrame:
-
-    '''
-    get AnA (fully assim or open loop) for defined bias calculation period 
-      (# days prior to ref time)
-     - if non-empty df passed in, fetch only data needed for this period update
-    '''
-
-    ref_back = t0 - timedelta(days = bias_period)
-    max_proc = max((cpu_count() - 2), 1)            
-
-    if no_da:
-        ext = "_noda_baseline"
-        config = specs.ana_config + "_no_da"
-    else:
-        ext = "_baseline"
-        config = specs.ana_config
-                
-    # define HDF5 store
-    group = admin.get_abbrev(specs.ana_config) + ext
-    store = pd.HDFStore(specs.data_dir / (group + ".h5"))
-       
-    # get list of ana timesteps (only need tm02 per reftime)
-    filelist = files.build_one_filelist(specs.domain, 'channel', specs.ana_config,
-                                         val_start = ref_back, val_end = t0, 
-                                         use_no_da = no_da)
-    
-    # get the list of valid times of the timesteps needed for the bias period
-    df_parsed_filelist = files.parse_nwm_filelist(filelist)
-    val_times_needed = set(df_parsed_filelist['val_time'])  
-    
-    # get list of valid times already in the df
-    # and keep only those needed for this cycle
-    if not df.empty:
-        val_times_in_df = set(df['value_time'])
-        df = df[df['value_time'].isin(list(val_times_needed))].copy()              
-    else:
-        val_times_in_df = set()    
-
-    # get the filelist for timesteps not in the dataframe thus need to be fetched    
-    val_times_fetch = sorted(list(val_times_needed.difference(val_times_in_df)))
-    fetch_file_indices = [list(df_parsed_filelist['val_time']).index(t) for t in val_times_fetch]
-    fetch_filelist = [filelist[i] for i in fetch_file_indices]    
-    print(f'    # {config} timesteps already in dataframe: {len(filelist) - len(fetch_filelist)}')
-
-    # fetch new data from cache or google cloud 
-    # (will usually be a list of 1, except first fcst reftime)
-    # NOTE - Could speed the first cycle up by sending the full file list
-    # into the hydrotools get_DataFrame function, which uses multiprocessing
-    for file in fetch_filelist:
-        
-        # convert file from Path to string for hydrotools
-        file_str = "/".join(file.parts)
-         
-        # ref time this timestep
-        ref_ts, t, c = files.parse_nwm_path(file)
-                                                                              
-        # HDF5 keys this AnA timestep's associated ref_time/issue time
-        key = f'/{group}/{config}/DT{ref_ts.strftime("%Y%m%dT%HZ")}'     
-    
-        # first check if the data are in the cache
-        if key in store:
-            print("     reading from cache: ", file_str)
-            df_ts = store[key]
-            df = pd.concat([df, df_ts])
-            df = df.sort_values(
-                        by=['nwm_feature_id', 'value_time'],
-                        ignore_index=True
-                        ) 
-                        
-        else:  # get it from google cloud
-        
-            try:
-                print("     fetching", file_str)
-                with ProcessPoolExecutor(
-                    max_workers=max_proc) as executor:
-                    dataframes = executor.map(
-                        ht_service.get_DataFrame, 
-                        [file_str],
-                        chunksize=1
-                        )
-                    
-                # Concatenate data
-                df_ts = pd.concat(dataframes)
-                
-                # Setup the rest
-                df_ts = ht_dataframe_setup(df_ts, config, ht_service)  
-                
-                # write to cache
-                store.put(
-                    key = key,
-                    value = df_ts,
-                    format = 'table',
-                )
-                
-                # concatenate to existing data, if any
-                df = pd.concat([df, df_ts])
-                df = df.sort_values(
-                            by=['nwm_feature_id', 'value_time'],
-                            ignore_index=True 
-                            )                
-                
-            except:
-                warnings.warn("Data retreival failed")
-      
-    return df
-    
+from hydrotools.nwm_client import gcp as nwm
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+import warnings
+
+from fpe_lite import admin, files
+
+# HDF5 chunk cache size (bytes) used when opening the caches, large enough to hold
+# the chunks of a full AnA timestep (PyTables default is 2 MB)
+HDF_CHUNK_CACHE_SIZE = 64 * 1024 * 1024
+
+# AnA configs whose file for a given valid time does not depend on the window or clock time,
+# so the filelist of the previous bias window can be reused - see get_ana_window_filelist
+# (latest_ana and extended AnA file selection depend on the window end and clock time)
+REUSABLE_WINDOW_CONFIGS = ['analysis_assim']
+
+def get_ht_crosswalk(
+    config,
+    ht_service
+    ) -> pd.DataFrame:
+    '''
+    get the hydrotools crosswalk with the additional metadata columns for a configuration
+    '''
+
+    # Reformat crosswalk, with additional columns 
+    # (assign returns a copy, the service crosswalk is left unchanged)
+    xwalk = ht_service.crosswalk.assign(
+        configuration = config,
+        measurement_unit = 'm3/s',
+        variable_name = 'streamflow'
+        )
+        
+    return xwalk
+    
+    
+def ht_dataframe_setup(
+    df, 
+    config, 
+    ht_service,
+    categorize = True,
+    xwalk = None
+    ) -> pd.DataFrame:
+    '''
+    set up dataframe in hydrotools format
+    (cannot use hydrotools directly to fetch single timesteps of AnA, 
+    so copying some chunks of code needed)
+     - if categorize is False, metadata columns are left as strings (e.g. for writing to HDF5)
+     - if setting up a batch of timesteps, pass in the crosswalk (from get_ht_crosswalk) 
+       so it is only built once
+    '''
+
+    # Rename
+    df = df.rename(columns={'streamflow': 'value'})
+
+    # Reformat crosswalk
+    if xwalk is None:
+        xwalk = get_ht_crosswalk(config, ht_service)
+
+    # Apply crosswalk metadata (single join on the crosswalk index)
+    df = df.merge(xwalk, how='left', left_on='nwm_feature_id', right_index=True, copy=False)
+
+    # Categorize
+    if categorize:
+        df = categorize_metadata(df)
+
+    # Sort values
+    df = df.sort_values(
+        by=['nwm_feature_id', 'value_time'],
+        ignore_index=True
+        )   
+    
+    return df
+    
+    
+def categorize_metadata(
+    df
+    ) -> pd.DataFrame:
+    '''
+    convert hydrotools metadata columns (those present in df) to categories
+    '''
+    
+    category_columns = ['configuration', 'measurement_unit', 'variable_name', 'usgs_site_code']
+    
+    return df.astype({col : 'category' for col in category_columns if col in df})
+    
+    
+def setup_and_cache_ana(
+    df_ts,
+    config,
+    ht_service,
+    store,
+    key,
+    columns = None,
+    xwalk = None
+    ) -> pd.DataFrame:
+    '''
+    set up a newly fetched AnA timestep in hydrotools format and write it to the cache,
+    returning only the requested columns (if any)
+     - metadata is written to the cache as strings and categorized only in memory
+    '''
+    
+    # Setup the rest
+    df_ts = ht_dataframe_setup(df_ts, config, ht_service, categorize = False, xwalk = xwalk)  
+
+    # write to cache
+    # - each timestep is always read back whole, so size the table
+    #   (and write batch) to the full timestep
+    store.put(
+        key = key,
+        value = df_ts,
+        format = 'table',
+        complib = 'blosc:lz4',
+        complevel = 5,
+        expectedrows = len(df_ts),
+        chunksize = len(df_ts),
+    )
+
+    if columns:
+        df_ts = df_ts[columns]
+        
+    return categorize_metadata(df_ts)
+    
+    
+def check_aligned(
+    df1,
+    df2,
+    columns
+    ) -> bool:
+    '''
+    check if two dataframes have identical values in the specified columns
+    (e.g. same locations/dates in AnA and no_da), using cheap checks first:
+     - number of rows, then first/last rows, then a row-wise hash of the columns
+    '''
+    
+    if len(df1) != len(df2):
+        return False
+        
+    if df1.empty:
+        return True
+    
+    for i in [0, -1]:
+        if not df1[columns].iloc[i].equals(df2[columns].iloc[i]):
+            return False
+            
+    hash1 = pd.util.hash_pandas_object(df1[columns], index=False).to_numpy()
+    hash2 = pd.util.hash_pandas_object(df2[columns], index=False).to_numpy()
+    
+    return np.array_equal(hash1, hash2)
+    
+    
+def get_ana_group(ana_config, no_da = False):
+    '''
+    get the HDF5 group name (also used as the cache filename) for AnA timesteps
+    '''
+    
+    if no_da:
+        ext = "_noda_baseline"
+    else:
+        ext = "_baseline"
+        
+    return admin.get_abbrev(ana_config) + ext
+    
+    
+def get_ana_window_filelist(
+    domain,
+    ana_config,
+    val_start,
+    val_end,
+    no_da = False,
+    window = None
+    ):
+    '''
+    get the list of AnA files and their valid times for a window of valid times
+     - if a dict is passed in as window, it holds the filelist of the previous window 
+       (empty on the first call) and is updated with this window's filelist
+     - as the bias window slides forward, the filelist of the previous window is reused,
+       dropping timesteps before val_start and building only the timesteps after its end
+       (only for configs in REUSABLE_WINDOW_CONFIGS, others are always rebuilt)
+    '''
+    
+    if window is None:
+        window = {}
+    
+    if (window and ana_config in REUSABLE_WINDOW_CONFIGS
+               and window['domain'] == domain and window['ana_config'] == ana_config 
+               and window['no_da'] == no_da
+               and window['val_start'] <= val_start <= window['val_end'] <= val_end):
+        
+        prior = window
+        
+        # keep the timesteps still within the window
+        keep = [i for i, val_time in enumerate(prior['val_times']) if val_time >= val_start]
+        filelist = [prior['filelist'][i] for i in keep]
+        val_times = [prior['val_times'][i] for i in keep]
+        
+        # add the timesteps after the end of the previous window
+        if val_end > prior['val_end']:
+            add_filelist = files.build_one_filelist(domain, 'channel', ana_config,
+                                                    val_start = prior['val_end'], val_end = val_end, 
+                                                    use_no_da = no_da)
+            add_val_times = list(files.parse_nwm_filelist(add_filelist)['val_time'])
+            
+            for file, val_time in zip(add_filelist, add_val_times):
+                if val_time > prior['val_end']:
+                    filelist.append(file)
+                    val_times.append(val_time)
+                    
+    else:
+        filelist = files.build_one_filelist(domain, 'channel', ana_config,
+                                            val_start = val_start, val_end = val_end, 
+                                            use_no_da = no_da)
+        val_times = list(files.parse_nwm_filelist(filelist)['val_time'])
+        
+    window.update({'domain' : domain,
+                   'ana_config' : ana_config,
+                   'no_da' : no_da,
+                   'val_start' : val_start, 
+                   'val_end' : val_end, 
+                   'filelist' : filelist, 
+                   'val_times' : val_times})
+        
+    return filelist, val_times
+    
+    
+def get_recent_ana(
+    specs,
+    ht_service,    
+    t0 = datetime(2020, 6, 2, 0),
+    bias_period = 10, 
+    no_da = False, 
+    df = pd.DataFrame(),
+    max_workers = 10,
+    store = None,
+    columns = None,
+    window = None
+    ) -> pd.DataFrame:
+
+    '''
+    get AnA (fully assim or open loop) for defined bias calculation period 
+      (# days prior to ref time)
+     - if non-empty df passed in, fetch only data needed for this period update
+     - max_workers sets the number of threads used to download timesteps
+     - if an open HDFStore is passed in, it is used (and left open) rather than 
+       reopening the cache file on every call
+     - if a list of columns is passed in, only those columns are read from the cache 
+       and returned (all columns are still written to the cache)
+     - if a dict is passed in as window, the AnA filelist of the previous call is kept there
+       and reused where possible (see get_ana_window_filelist), pass the same dict each call
+    '''
+
+    ref_back = t0 - timedelta(days = bias_period)
+
+    if no_da:
+        config = specs.ana_config + "_no_da"
+    else:
+        config = specs.ana_config
+                
+    # HDF5 store group
+    group = get_ana_group(specs.ana_config, no_da)
+       
+    # get list of ana timesteps (only need tm02 per reftime) 
+    # and their valid times needed for the bias period
+    filelist, val_times = get_ana_window_filelist(specs.domain, specs.ana_config, 
+                                                  ref_back, t0, no_da = no_da, window = window)
+    val_times_needed = set(val_times)  
+    
+    # get list of valid times already in the df
+    # and keep only those needed for this cycle
+    if not df.empty:
+        val_times_in_df = set(df['value_time'])
+        df = df[df['value_time'].isin(list(val_times_needed))].copy()              
+    else:
+        val_times_in_df = set()    
+
+    # get the filelist for timesteps not in the dataframe thus need to be fetched    
+    val_times_fetch = val_times_needed.difference(val_times_in_df)
+    fetch_filelist = [file for file, val_time in zip(filelist, val_times)
+                      if val_time in val_times_fetch]    
+    print(f'    # {config} timesteps already in dataframe: {len(filelist) - len(fetch_filelist)}')
+
+    # define HDF5 store, opened here (and closed on exit) if not passed in 
+    if store is None:
+        store_context = pd.HDFStore(specs.data_dir / (group + ".h5"), 
+                                    CHUNK_CACHE_SIZE = HDF_CHUNK_CACHE_SIZE)
+    else:
+        store_context = nullcontext(store)
+    
+    with store_context as store:
+    
+        # fetch new data from cache or google cloud 
+        # (will usually be a list of 1, except first fcst reftime)
+        # - timesteps already in the cache are read directly, the rest are 
+        #   collected and downloaded together below
+        # - new timesteps are collected in a list and concatenated/sorted once at the end
+        new_frames = []
+        fetch_keys = {}
+        for file in fetch_filelist:
+        
+            # convert file from Path to string for hydrotools
+            file_str = "/".join(file.parts)
+         
+            # ref time this timestep
+            ref_ts, t, c = files.parse_nwm_path(file)
+                                                                              
+            # HDF5 keys this AnA timestep's associated ref_time/issue time
+            key = f'/{group}/{config}/DT{ref_ts.strftime("%Y%m%dT%HZ")}'     
+    
+            # first check if the data are in the cache
+            if key in store:
+                print("     reading from cache: ", file_str)
+                new_frames.append(categorize_metadata(store.select(key, columns = columns)))
+                        
+            else:  # get it from google cloud
+                fetch_keys[file_str] = key
+            
+        # a single timestep (usual case after the first reftime) is fetched directly,
+        # otherwise downloads are I/O bound, so submit them all to one thread pool up front,
+        # then set up and cache each timestep (in this thread) as it arrives
+        if len(fetch_keys) == 1:
+        
+            file_str, key = next(iter(fetch_keys.items()))
+            
+            try:
+                print("     fetching", file_str)
+                df_ts = ht_service.get_DataFrame(file_str)
+                df_ts = setup_and_cache_ana(df_ts, config, ht_service, store, key, columns)
+                new_frames.append(df_ts)
+                
+            except:
+                warnings.warn(f"Data retreival failed: {file_str}")
+        
+        elif fetch_keys:
+        
+            # crosswalk metadata is the same for all timesteps in the batch
+            xwalk = get_ht_crosswalk(config, ht_service)
+            
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(fetch_keys))) as executor:
+            
+                futures = {}
+                for file_str in fetch_keys:
+                    print("     fetching", file_str)
+                    futures[executor.submit(ht_service.get_DataFrame, file_str)] = file_str
+                
+                for future in as_completed(futures):
+            
+                    file_str = futures[future]
+                    key = fetch_keys[file_str]
+        
+                    try:
+                        df_ts = future.result()
+                        df_ts = setup_and_cache_ana(df_ts, config, ht_service, store, key, columns, xwalk)
+                        new_frames.append(df_ts)
+                    
+                    except:
+                        warnings.warn(f"Data retreival failed: {file_str}")
+      
+    # concatenate to existing data, if any
+    # - each new frame is one timestep (single valid time) already sorted by feature id, 
+    #   so if the frames are concatenated in valid time order after the existing data, 
+    #   a stable sort on feature id alone gives the order by feature id and valid time
+    new_frames = sorted([df_ts for df_ts in new_frames if not df_ts.empty],
+                        key = lambda df_ts: df_ts['value_time'].iloc[0])
+    if new_frames:
+        in_time_order = df.empty or df['value_time'].max() < new_frames[0]['value_time'].iloc[0]
+        if not df.empty:
+            new_frames.insert(0, df)
+        df = pd.concat(new_frames, copy=False, ignore_index=True)
+        
+        if in_time_order:
+            sort_by = ['nwm_feature_id']
+        else:
+            sort_by = ['nwm_feature_id', 'value_time']
+            
+        df = df.sort_values(
+                    by=sort_by,
+                    ignore_index=True,
+                    kind='mergesort'
+                    )
+      
+    return df
+    
@@ -1,7 +1,7 @@
-# __init__.py
-
-from . import admin
-from . import specs
-from . import files
-from . import raw
-from . import reftime
+# __init__.py
+
+from . import admin
+from . import specs
+from . import files
+from . import raw
+from . import reftime
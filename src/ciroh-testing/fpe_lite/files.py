@@ -1,1109 +1,1140 @@
-''' 
-Collection of utilities to work with NWM raw data files for evaluations.  
-Including generating lists of NWM files needed to build timeseries
-'''
-
-import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
-from pathlib import Path
-
-from . import admin, reftime, raw
-
-
-def get_filelists(specs, variable, i = 0):
-    '''
-    create a dictionary of filelists for all requested evaluations, break into chunks if necessary
-    '''
-
-    config_list = [specs.fcst_config, specs.verif_config]
-    
-    # when processing only a portion of the forecast, need to pass the partial duration into filelist methods
-    # for current eval_timing and latest_ana mode
-    if specs.fcst_config == 'medium_range' and specs.verif_config == 'latest_ana' and specs.eval_timing == 'current':
-        # for MRF with partial periods defined, there will be one reftime per store period, so reftime[i] matches store_period[i]
-        partial_duration = specs.store_periods[i]
-    else:
-        partial_duration = -999
-    
-    # now get the list(s) of NWM output files needed for this evaluation
-    df_filelists = build_df_filelists(specs.domain, [variable], config_list, [specs.ref_time],
-                                            ana_align_to = specs.fcst_config, include_t0 = True, 
-                                            partial_duration = partial_duration)
-    
-    # If reading in more than 24 timesteps (e.g. med range), break filelist into chunks
-    # to avoid memory issues (n = chunk size in hours)
-    df_filelists, n_chunks = get_filelist_chunks_by_df(df_filelists, n = 24)
-    
-    # create df_filelist for each chunk and store in dictionary
-    dict_filelists = {}
-    dict_filelists_keep = {}
-    
-    if n_chunks > 1:
-        for chunk in range(n_chunks):
-        
-            f = [df_filelists.loc[i,'filelist_chunks'][chunk] for i in df_filelists.index]
-
-            df_filelists_chunk = df_filelists.loc[:,:'variable']
-            df_filelists_chunk['filelist'] = f
-            
-            # check that the dates do not extend beyond the most recent AnA time
-            last_ana_valtime = reftime.get_most_recent_ana_valtime(specs)
-            max_list_time = parse_nwm_filelist(f[1])['reftime'].max()
-            
-            # if the date list in this chunk is feasible, keep it
-            if max_list_time <= last_ana_valtime:
-            
-                # key the dictionary from 1 to nchunks (1-based indexing)
-                dict_filelists[chunk + 1] = df_filelists_chunk
-                
-        # remove any pointless chunks to save processing time - e.g. there is no point processing day 4 
-        # if not storing it and if day 5 cannot be processed because it goes beyond current clocktime
-        included_periods = [p for p in specs.store_periods if p in dict_filelists.keys()]
-        if included_periods:
-            max_included_period = max(included_periods)
-            for key in dict_filelists.keys():
-                if key <= max_included_period:
-                    dict_filelists_keep[key] = dict_filelists[key]       
-        else:
-            raise ValueError('None of the requested analysis periods are feasible for this reference time')
-            
-    else:
-        dict_filelists_keep[1] = df_filelists        
-       
-    return dict_filelists_keep
-
-
-def get_filelists_fcsts(specs, variable, i = 0):
-    '''
-    create a dataframe of filelists for all requested evaluations
-    '''
-
-    config_list = [specs.fcst_config, specs.verif_config]
-    
-    # when processing only a portion of the forecast, need to pass the partial duration into filelist methods
-    # for current eval_timing and latest_ana mode
-    if specs.fcst_config == 'medium_range' and specs.verif_config == 'latest_ana' and specs.eval_timing == 'current':
-        # for MRF with partial periods defined, there will be one reftime per store period, so reftime[i] matches store_period[i]
-        partial_duration = specs.store_periods[i]
-    else:
-        partial_duration = -999
-    
-    # now get the list(s) of NWM output files needed for this evaluation
-    df_filelists = build_df_filelists(specs.domain, [variable], config_list, [specs.ref_time],
-                                            ana_align_to = specs.fcst_config, include_t0 = True, 
-                                            partial_duration = partial_duration)
-    
- 
-def build_df_filelists(domain, var_list, config_list, ref_time_list, val_start = -999, val_end = -999, 
-                       ana_align_to = 'none', include_t0 = False, use_no_da = False, partial_duration = -999):
-    '''
-    Create a dataframe of filelists and configuration specs for multiple configurations
-    Dataframe columns:
-        - ref_time      reference time
-        - config        NWM configuration (or 'latest_ana')
-        - variable      variable, channel or forcing
-        - filelist      list of all filenames for the ref time and configuration
-        - list_start    first datetime in the filelist
-        - list_end      last datetime in the filelist
-        
-    Parameters:
-    domain:             NWM geographic domain
-    var_list:           list of variables to generate filelists
-    config_list:        list of configurations to generate filelists
-    ref_time_list:      list of reference times to generate filelists
-    val_start:          first valid time to include in the list from each simulation, if -999 include all timesteps
-    val_end:            last valid time to include in the list from each simulation, if -999 include all timesteps
-    ana_align_to:       if ana config, define which forecast configuration timesteps to align to, if any
-    include_t0:         if forecast, include T0 or not
-    use_no_da:          if ana, use the no_da version or not
-    '''
-
-    # initialize filelist dataframe
-    df_filelists = pd.DataFrame()
-     
-    # loop through lists of reference times, configurations, and variables generating
-    # generating filelists 
-    print('')
-    ind = 0
-    for ref_time in ref_time_list:
-        for config in config_list:
-            for variable in var_list:
-
-                filelist = build_one_filelist(domain, variable, config, ref_time = ref_time, 
-                                              val_start = val_start, val_end = val_end, 
-                                              ana_align_to = ana_align_to,
-                                              include_t0 = include_t0,
-                                              use_no_da = use_no_da,
-                                              partial_duration = partial_duration)
-
-                # append the list to dataframe if not empty
-                if filelist:
-                
-                    df_filelists = df_filelists.append(pd.DataFrame({'ref_time' : ref_time,
-                                                                     'config' : config, 
-                                                                     'variable' : variable, 
-                                                                     'filelist' : [filelist]},
-                                                                      index = [ind]))
-                else:
-                    print('   ! No timesteps found within the event range for forecast: ',ref_time)
-            
-                ind += 1
-        
-    return df_filelists  
-    
-    
-def build_one_filelist(domain, variable, config, ref_time = -999, val_start = -999, val_end = -999,
-                       ana_align_to = 'none', include_t0 = False, use_no_da = False, partial_duration = -999):
-    '''
-    Build a single filelist based on single domain, variable, config, and reftime
-    See build_df_filelists for description of parameters
-    '''
-                       
-    # get version based on ref_time
-    if ref_time != -999:
-        version = admin.nwm_version(ref_time)
-    elif val_start != -999:
-        version = admin.nwm_version(val_start)
-    else:
-        raise ValueError(f"no valid date:  ref time = {ref_time} and valid time = {val_start}")
-     
-    # if config = 'latest_ana' (mix of std and ext ana) use standard ana to get configuration settings
-    # but set flag (orig_config) to trigger 'latest_ana' method for AnA timestep selection  
-    passed_config = config   
-    if config == 'latest_ana':
-        config = 'analysis_assim'
-
-    # for Std AnA, flag to use tm02 rather than tm00 when piecing together time series
-    # (hard-coding for now until becomes apparent it needs to be an argument)
-    use_tm02 = True
-        
-    # get base dataframe of config and variable info
-    df_config = admin.config_specs(config, domain, version)
-    df_var = admin.variable_specs(domain)
-
-    # base configuration directory prefix (e.g. 'forcing')
-    dir_prefix = df_var.loc[variable, 'dir_prefix']
-    
-    # variable string used in filename ('forcing' or 'channel_rt' for now)
-    var_string_stem = df_var.loc[variable, 'var_string']    
-
-    # base configuration directory suffix (e.g. 'mem1' for medium_range ensemble member 1)    
-    dir_suffix = df_config.loc[config, 'dir_suffix']
-
-    # suffix at the end of the variable name (e.g. '1' for medium_range ensemble mem1)
-    var_str_suffix = df_config.loc[config, 'var_str_suffix']
-
-    # flag to trigger using suffixes or not (for forcing or hawaii)
-    use_suffix = df_var.loc[variable, 'use_suffix']   
-    
-    # get duration, time interval and whether it is a forecast 
-    # (flag for "f" versus "tm")
-    is_forecast = df_config.loc[config,"is_forecast"]    
-    ts_int = df_config.loc[config,"timestep_int"].item()
-    n_hours = df_config.loc[config,"duration_hrs"].item()
-    
-    if partial_duration > 0:
-        n_hours = partial_duration * 24
-
-    # initialize the datedir (and ref_time if none provided)
-    if ref_time == -999:
-       ref_time = val_start 
-    datedir = ref_time.strftime("nwm.%Y%m%d")  # ref date directory   
-      
-    # Set date range if not defined for AnA, set to
-    # to the duration of the duration_config
-    if not is_forecast and val_start == -999:
-        # for ana, if val_start/end are -999, dates are based on 'ana_align_to' forecast config
-        # if 'ana_align_to' is not set, default to short range
-        if ana_align_to == 'none':
-            ana_align_to = 'short_range'          
-        n_hours = admin.config_specs(ana_align_to, domain, version).loc[ana_align_to,"duration_hrs"].item()
-        
-        if partial_duration > 0:
-            n_hours = partial_duration * 24
-   
-    # if forecast, run the forecast fileparts function   
-    if is_forecast:
-        df_parts, list_start, list_end = build_forecast_fileparts(ref_time, config, n_hours, ts_int, 
-                                                                  include_t0, val_start, val_end)                                                    
-    
-    # if AnA, fileparts function varies based on whether or not a valid time range is defined (val_start/end = -999)
-    else:
-        # if no valid time range is defined (val_start/end = -999), dates are selected based on 'ana_align_to' forecast duration
-        if val_start == -999:
-            # if 'ana_align_to' is not set, default to short range to get duration
-            if ana_align_to == 'none':
-                ana_align_to = 'short_range'          
-                n_hours = admin.config_specs(ana_align_to, domain, version).loc[ana_align_to,"duration_hrs"].item()  
-                
-                if partial_duration > 0:
-                    n_hours = partial_duration * 24
-
-            # get filename parts for an ana config aligned to a specified forecast config and ref time
-            df_parts, list_start, list_end = build_ana_fileparts_aligned_to_forecast(ref_time, passed_config, n_hours, ts_int, include_t0, domain)
-            
-        else:
-            # if valid time range was defined, get filename parts for ana config within the valid range
-            df_parts, list_start, list_end = build_ana_fileparts_defined_range(val_start, val_end, ts_int, passed_config, domain)
-  
-    # console messages 
-    if val_start != -999:
-        print ("Building file list for", config, variable,"| reference time:", ref_time, "| valid time range:", val_start, "to", val_end)
-    else:
-        print ("Building file list for", config, variable,"| reference time:", ref_time, "| all timesteps")          
-       
-    # loop through fileparts dataframe, add prefix/suffixes, and build filenames
-    # include each file in the list only if it's valid time falls within the requested range (if range defined)
-    filelist = []
-    count = 0
-    for index, row in df_parts.iterrows():
-        
-        # add prefix and suffixes as needed
-        config_dir = dir_prefix + row['config']
-        var_string = var_string_stem
-        if use_suffix:  
-            # do not add the dir suffix for T0 on a forecast (i.e., AnA file, while rest are fcst files)
-            if row['config'] == config:
-                config_dir = config_dir + dir_suffix
-                var_string = var_string_stem + var_str_suffix
-            
-        # if the valid time of the forecast time step is within the list range, include it
-        val_time = row['val_time']
-        
-        if val_time >= list_start and val_time <= list_end:
-            
-            # build the filename
-            filename_parts = ['nwm',
-                               row['ref_hr_string'], 
-                               row['config'],
-                               var_string,
-                               row['ts_hr_string'], 
-                               domain,
-                              'nc']
-                      
-            filename = ".".join(filename_parts)
-            
-            # add the full path to the list
-            filelist.append(Path(row['datedir']) / config_dir / filename)
-            
-            count += 1
-                
-    # console messages
-    if not filelist:
-        print('   No timesteps found in range', val_start, 'to', val_end)
-    else:
-        if val_start != -999:
-            print('   ',count, 'timesteps found in range', val_start, 'to', val_end)     
-    
-    # if using no_da, add no_da string to the filenames
-    if use_no_da:
-        filelist = add_no_da_to_filelist(filelist)
- 
-    return filelist
-    
-   
-def build_filelist_by_reftime(domain, variable, config, ref_time, use_no_da = False):
-    '''
-    Build a nwm filelist of all files associated with a nwm domain, variable, config, and reftime
-
-    Parameters:
-    domain:             NWM geographic domain
-    variable:           variable - channel or forcing
-    config:             NWM configuration ('short_range','medium_range','analysis_assim_extend',
-                                           'analysis_assim','latest_ana')
-    ref_time:           forecast (or ana) reference time
-    use_no_da:          if ana, use the no_da version or not
-    '''
-                       
-    # get version based on ref_time
-    version = admin.nwm_version(ref_time)
-        
-    # get base dataframe of config and variable info
-    df_config = admin.config_specs(config, domain, version)
-    df_var = admin.variable_specs(domain) 
-    
-    # get duration, time interval and whether it is a forecast 
-    # (flag for "f" versus "tm")
-    is_forecast = df_config.loc[config,"is_forecast"]    
-    ts_int = df_config.loc[config,"timestep_int"].item()
-    n_hours = df_config.loc[config,"duration_hrs"].item()
-
-    # initialize the datedir (and ref_time if none provided)
-    datedir = ref_time.strftime("nwm.%Y%m%d")  # ref date directory   
-      
-    # get a dataframe of the filename parts for the defined nwm config
-    df_parts = build_reftime_fileparts(ref_time, config, n_hours, ts_int, is_forecast)                            
-
-    member_str = ""
-    if config == 'medium_range':
-        member_str = "| member " + str(member) 
-
-    print ("---Building file list for", config, variable,"| reference time:", ref_time, "| all timesteps",  member_str)          
-       
-    # build the filelist from all the parts
-    filelist = build_filelist_from_parts(domain, version, config, variable, df_parts)   
-        
-    if use_no_da:
-        filelist = add_no_da_to_filelist(filelist)
- 
-    return filelist
-
-
-def get_filelist_start_end(ref_time, config, n_hours, ts_int, is_forecast = True,
-                           include_t0 = False, val_start = -999, val_end = -999):
-                       
-    '''
-    Get the start and end datetimes of a list of files for specific specs
-    '''
-                            
-    # Get the forecast start and end datetime.  
-    # First getting list of all files for the forecast, later will keep only those in the valid range 
-    # Include T0 (from standard AnA) based on argument
-
-    if is_forecast:
-    
-        forecast_end = ref_time + timedelta(hours=n_hours)  
-        
-        if include_t0:
-            forecast_start = ref_time           
-            n_files = int(n_hours/ts_int + 1)
-        else:
-            forecast_start = ref_time + timedelta(hours=ts_int)
-            n_files = int(n_hours/ts_int)           
-
-    else:
-        forecast_start = ref_time - timedelta(hours=n_hours-1)  
-        forecast_end = ref_time
-
-    # initialize the start and end dates of the filelist
-    # if a range of valid times to use was not defined, include all timesteps of the forecast    
-    if val_start == -999:
-        list_start = forecast_start
-        list_end = forecast_end       
-    else:
-        list_end = val_end
-        list_start = val_start       
-        
-    print(n_files, ts_int, forecast_start)
-        
-    return list_start, list_end
- 
- 
-def build_filelist_from_parts(domain, version, config, variable, df_parts, list_start = -999, list_end = -999):
-    '''
-    Build a list of filenames from a dataframe of the filename parts
-    '''
-
-    # get base dataframe of config and variable info
-    df_config = admin.config_specs(config, domain, version)
-    df_var = admin.variable_specs(domain)
-
-    # base configuration directory prefix (e.g. 'forcing')
-    dir_prefix = df_var.loc[variable, 'dir_prefix']
-    
-    # variable string used in filename ('forcing' or 'channel_rt' for now)
-    var_string_stem = df_var.loc[variable, 'var_string']    
-
-    # base configuration directory suffix (e.g. 'mem1' for medium_range ensemble member 1)    
-    dir_suffix = df_config.loc[config, 'dir_suffix']
-
-    # suffix at the end of the variable name (e.g. '1' for medium_range ensemble mem1)
-    var_str_suffix = df_config.loc[config, 'var_str_suffix']
-
-    # flag to trigger using suffixes or not (for forcing or hawaii)
-    use_suffix = df_var.loc[variable, 'use_suffix']   
-    
-    # if list_start and end are -999, set q
-
-    # loop through fileparts dataframe, add prefix/suffixes, and build filenames
-    # include each file in the list only if it's valid time falls within the requested range (if range defined)
-    filelist = []
-    count = 0
-    include_all = True
-    if list_start != -999 and list_end != -999:
-        include_all = False
-        
-    for index, row in df_parts.iterrows():
-        
-        # add prefix and suffixes as needed
-        config_dir = dir_prefix + row['config']
-        
-        var_string = var_string_stem
-        if use_suffix:
-            config_dir = config_dir + dir_suffix
-            var_string = var_string_stem + var_str_suffix
-            
-        val_time = row['val_time']
-               
-        # if the valid time of the forecast time step is within the list range, include it
-        if include_all or (val_time >= list_start and val_time <= list_end):
-            
-            # build the filename
-            filename_parts = ['nwm',
-                               row['ref_hr_string'], 
-                               row['config'],
-                               var_string,
-                               row['ts_hr_string'], 
-                               domain,
-                              'nc']
-                      
-            filename = ".".join(filename_parts)
-            
-            # add the full path to the list
-            filelist.append(Path(row['datedir']) / config_dir / filename)
-            
-            count += 1
- 
-    return filelist    
-
-
-def build_reftime_fileparts(ref_time, config, n_hours, ts_int, is_forecast = True, include_t0 = False):
-    '''
-    Build dataframe of filename parts for a specific reference time
-    '''
-    
-    if include_t0 and is_forecast:
-        n_files = int(n_hours/ts_int + 1)
-    else:
-        n_files = int(n_hours/ts_int)
-        
-    # initialize the file parts dataframe
-    df_parts = pd.DataFrame(
-            {"datedir" : np.full(n_files, ref_time.strftime("nwm.%Y%m%d")),
-             "ref_hr_string" : np.full(n_files, 't00z'),
-             "config" : np.full(n_files, config),
-             "ts_hr_string" : np.full(n_files, 'tm00'),
-             "val_time" : np.full(n_files, ref_time)},
-             index = np.arange(n_files))  
-    
-    #### Get filename parts for all files associated with the config and reference time
-    if is_forecast:
-        df_parts = get_forecast_fileparts(ref_time, n_files, df_parts, ts_int, False)   
-    else:
-        df_parts = get_simple_ana_fileparts(ref_time, n_hours, df_parts, ts_int)
-    
-    return df_parts    
-    
-    
-def build_forecast_fileparts(ref_time, config, n_hours, ts_int, include_t0, val_start, val_end):
-    '''
-    Build dataframe of filename parts for a forecast configuration
-    '''
-
-    # Get the forecast start and end datetime.  
-    # First getting list of all files for the forecast, later will keep only those in the valid range 
-    # Include T0 (from standard AnA) based on argument
-    if include_t0:
-        forecast_start = ref_time
-        n_files = int(n_hours/ts_int + 1)
-    else:
-        forecast_start = ref_time + timedelta(hours=ts_int)
-        n_files = int(n_hours/ts_int)
-        
-    forecast_end = ref_time + timedelta(hours=n_hours)     
-
-    # initialize the start and end dates of the filelist
-    list_end = val_end
-    list_start = val_start    
-
-    # if a range of valid times to use was not defined, include all timesteps of the forecast
-    if val_start == -999:
-        list_start = forecast_start
-        list_end = forecast_end                  
-    
-    # check if the end of the forecast is before the end of the valid range
-    # (if so, results will be plotted differently in AAR plots)
-    if forecast_end < list_end:
-        list_end = forecast_end
-        
-    # check if the start of the forecast is after the start of the valid range
-    if ref_time > list_start:
-        list_start = ref_time + timedelta(hours=ts_int)
-        
-    # initialize the file parts dataframe
-    df_parts = pd.DataFrame(
-            {"datedir" : np.full(n_files, ref_time.strftime("nwm.%Y%m%d")),
-             "ref_hr_string" : np.full(n_files, 't00z'),
-             "config" : np.full(n_files, config),
-             "ts_hr_string" : np.full(n_files, 'tm00'),
-             "val_time" : np.full(n_files, ref_time)},
-             index = np.arange(n_files))
-    
-    #### Get filename parts for all files associated with the config and reference time
-    df_parts = get_forecast_fileparts(ref_time, n_files, df_parts, ts_int, include_t0)   
-    
-    return df_parts, list_start, list_end
-    
-
-def get_forecast_fileparts(ref_time, n_files, df_parts, ts_int, include_t0):
-    '''
-    Get filename parts for a forecast configuration
-    '''   
- 
-    # loop through to build each filename
-    for i in range(n_files): # (1 through n_files)
-               
-        if i == 0 and include_t0:
-        
-            # timestep is always T0 in this case
-            ts_hr = 0
-        
-            # T0 comes from standard AnA tm00
-            df_parts.loc[i,'ref_hr_string'] = 't' + ref_time.strftime("%Hz")
-            df_parts.loc[i,'config'] = 'analysis_assim'
-            df_parts.loc[i,'ts_hr_string'] = 'tm00'
-            
-            # if ts_int is a fraction (hawaii is 15 min), add minutes to the time string
-            if ts_int%1 > 0:
-                df_parts.loc[i,'ts_hr_string'] = 'tm0000'
-            
-        #otherwise, skip i = 0    
-        else:
-        
-            # if T0 was included, will enter the above code rather than here, so i=1 on first entry here
-            # otherwise i=0 on first entry here and need to add 1 so i=1.
-            if include_t0:
-                ts_hr = i*ts_int
-            else:
-                ts_hr = (i+1)*ts_int
-
-            # update date directory
-            df_parts.loc[i,'datedir'] = ref_time.strftime("nwm.%Y%m%d")  
-            
-            # update the reference time string
-            df_parts.loc[i,'ref_hr_string'] = 't' + ref_time.strftime("%Hz") 
-            
-            # create the forecast time step string
-            df_parts.loc[i,'ts_hr_string'] = "f" + str(ts_hr).zfill(3)    
-            
-            # if ts_int is a fraction (hawaii is 15 min), add minutes to the time string
-            if ts_int%1 > 0:
-                df_parts.loc[i,'ts_hr_string'] = "f" + str(int(np.floor(ts_hr))).zfill(3) + str(int(ts_hr%1*60)).zfill(2)
-
-        val_time = ref_time + timedelta(hours=ts_hr)
-        df_parts.loc[i,'val_time'] = val_time
-             
-    return df_parts  
-    
-    
-def build_ana_fileparts_aligned_to_forecast(ref_time, config, n_hours, ts_int, include_t0, domain):
-    '''
-    Build a dataframe of filename parts for an AnA configuration aligned with the valid times of a 
-    specified forecast configuration
-    '''
-    
-    #print('n_hours', n_hours)
-    
-    # get the start datetime of the aligning forecast
-    # include t0 or not based on include_t0 argument
-    if include_t0:
-        forecast_start = ref_time
-        n_files = int(n_hours/ts_int + 1)
-    else:
-        forecast_start = ref_time + timedelta(hours=ts_int)
-        n_files = int(n_hours/ts_int)
-    
-    # get the end datetime of the aligning forecast
-    forecast_end = ref_time + timedelta(hours=n_hours)          
-    
-    # the start and end dates of the filelist is the full forecast duration in this case
-    list_start = forecast_start
-    list_end = forecast_end    
-            
-    # initialize the file parts dataframe
-    df_parts = pd.DataFrame(
-            {"datedir" : np.full(n_files, ref_time.strftime("nwm.%Y%m%d")),
-             "ref_hr_string" : np.full(n_files, 't00z'),
-             "config" : np.full(n_files, config),
-             "ts_hr_string" : np.full(n_files, 'tm00'),
-             "val_time" : np.full(n_files, ref_time)},
-             index = np.arange(n_files))
-    
-    # Get filename parts for all AnA files corresponding to the valid time range
-    if config == 'latest_ana':
-        # if latest_ana and domain is conus, use the latest_ana_fileparts function 
-        # (only works for conus, where there is an extended ana configuration)
-        if domain == 'conus':
-            df_parts = get_latest_ana_fileparts(ref_time, n_hours, ts_int, df_parts, include_t0, domain)
-            
-        # for other domains use the ana_fileparts function with is_latest flag set to True
-        else:
-            df_parts = get_ana_fileparts(ref_time, config, n_files, ts_int, df_parts, include_t0, is_latest = True)
-
-    else:
-        # for standard and extended-only configs, use the get_ana_fileparts function (is_latest=False by default)
-        df_parts = get_ana_fileparts(ref_time, config, n_files, ts_int, df_parts, include_t0)
-        
-    return df_parts, list_start, list_end
-       
-    
-def build_ana_fileparts_defined_range(val_start, val_end, ts_int, config, domain):
-    '''
-    Build a dataframe of filename parts for an AnA configuration within a specified
-    valid start/end time
-    '''
-
-    # for a defined date range, include_t0 is always True
-    include_t0 = True    
-    
-    # n_hours is the hours between and including start/end dates
-    delta = val_end - val_start
-    n_hours = int(delta.total_seconds() / 3600) + 1
-    if ts_int == 1:
-        n_files = n_hours
-    else:
-        n_files = int(n_hours/ts_int + 1)
-    
-    # the start and end dates of the filelist match the defined range in this case
-    list_end = val_end
-    list_start = val_start  
-            
-    # initialize the file parts dataframe
-    df_parts = pd.DataFrame(
-            {"datedir" : np.full(n_files, val_start.strftime("nwm.%Y%m%d")),
-             "ref_hr_string" : np.full(n_files, 't00z'),
-             "config" : np.full(n_files, config),
-             "ts_hr_string" : np.full(n_files, 'tm00'),
-             "val_time" : np.full(n_files, val_start)},
-             index = np.arange(n_files))
-    
-    # Get filename parts for all AnA files corresponding to the valid time range
-    if config == 'latest_ana':
-        # if latest_ana and domain is conus, use the latest_ana_fileparts function 
-        # (only works for conus, where there is an extended ana configuration)
-        if domain == 'conus':
-            # to make this work, need to subtract 1 from n_hours, it will be added back in this function if 
-            # include_t0 = True, which is always is here
-            df_parts = get_latest_ana_fileparts(val_start, n_hours-1, ts_int, df_parts, include_t0, domain)
-            
-        # for other domains use the ana_fileparts function with is_latest flag set to True
-        else:
-            df_parts = get_ana_fileparts(val_start, config, n_files, ts_int, df_parts, include_t0, is_latest = True)
-            
-    else:
-        # if straightforward AnA (standard or extended) use ana_fileparts
-        df_parts = get_ana_fileparts(val_start, config, n_files, ts_int, df_parts, include_t0)
-        
-    return df_parts, list_start, list_end  
-    
-
-def get_ana_fileparts(start_time, config, n_files, ts_int, df_parts, include_t0, use_tm02 = True, is_latest = False):
-    '''
-    Build a dataframe of filename parts for an AnA configuration based on argument specifications
-    '''
-    
-    #get current clock time to check if "next day AnA" is available yet
-    clock_ztime = datetime.utcnow().replace(second=0, microsecond=0, minute=0)    
-
-    for i in range(n_files):
-    
-        # get ts_hr - the time of this timestep iteration relative to the start time
-        # when T0 not included (will only occur when aligning with a forecast), shift ts_hr forward 
-        if include_t0:
-            ts_hr = i*ts_int 
-        else:
-            ts_hr = (i+1)*ts_int       
-               
-        # get the valid time of the timestep for this iteration
-        val_time = start_time + timedelta(hours=ts_hr) # calendar date/time of forecast timestep
-
-        if config == "analysis_assim_extend":
-            #e-AnA only runs in 16z cycle, get all output from this ref-time, either current or next date
-            ref_hr_string = '16z'  
-            
-            #Valid hours 0-12 --> align with tm16-tm04 in same date directory
-            if val_time.hour < 13:  
-                datedir = val_time.strftime("nwm.%Y%m%d")
-                ts_hr = 16 - val_time.hour            
-                
-            #Valid hours 13-23 --> align with tm27-tm17 in next date directory    
-            else:              
-                nextday = (val_time + timedelta(days=1)).replace(second=0, microsecond=0, minute=0)
-                datedir = (nextday).strftime("nwm.%Y%m%d")
-                ts_hr = 40 - val_time.hour
-                              
-                # if nextday not yet available, fill in tm03-00 from current day
-                if nextday.replace(hour=19) > clock_ztime:
-                    datedir = val_time.strftime("nwm.%Y%m%d")
-                    ts_hr = 16 - val_time.hour
-                    
-                    # if the ts_hr becomes negative, use next day - will be missing but keep in the filelist
-                    if ts_hr < 0:
-                        ts_hr = 40 - val_time.hour
-                        datedir = (nextday).strftime("nwm.%Y%m%d")
-             
-        else:
-            #standard AnA runs every cycle, if get_tm02 = True, use tm02 from ref_time + 2, else use tm00 from ref-time
-            if use_tm02:
-                datedir = (val_time + timedelta(hours=2)).strftime("nwm.%Y%m%d")
-                ref_hr_string = (val_time + timedelta(hours=2)).strftime("%Hz")
-                ts_hr = 2
-                
-                val_minutes = val_time.minute
-                if val_minutes > 0:
-                    ts_min = 60 - val_minutes
-                else:
-                    ts_min = 0
-                
-                # if building most recent possible filelist, end with T0
-                if is_latest:
-                
-                    # 2nd to last file is T1 of most recent available reftime
-                    if i >= (n_files - (1/ts_int) - 1):                      
-                        datedir = (val_time + timedelta(hours=1)).strftime("nwm.%Y%m%d")
-                        ref_hr_string = (val_time + timedelta(hours=1)).strftime("%Hz")                      
-                        ts_hr = 1
-   
-                    # last file is T0 of most recent available reftime
-                    if i == n_files - 1:
-                        datedir = val_time.strftime("nwm.%Y%m%d")
-                        ref_hr_string = val_time.strftime("%Hz")
-                        ts_hr = 0    
-                
-                # if valid time is not top of the hour, need to subtract an hour to get the 
-                # corresponding AnA timestep string, since they increase going backward in time
-                if val_minutes > 0:
-                    ts_hr = ts_hr - 1
-                
-            # if get_tm02 is False, use the t00 from each standard AnA (currently never used)
-            # ** this option does not yet work if timestep interval (ts_int) is < 1 hour
-            else:
-                datedir = val_time.strftime("nwm.%Y%m%d")
-                ref_hr_string = val_time.strftime("%Hz")
-                ts_hr = 0
-                  
-        # update filename parts dataframe
-        df_parts.loc[i,'datedir'] = datedir
-        df_parts.loc[i,'ref_hr_string'] = 't' + ref_hr_string    
-        df_parts.loc[i,'ts_hr_string'] = 'tm' + str(ts_hr).zfill(2)
-        df_parts.loc[i,'val_time'] = val_time
-        
-        # if using this function to get the latest AnA, the config is always standard AnA 
-        if is_latest:
-            df_parts.loc[i,'config'] = 'analysis_assim'
-        
-        # if ts_int is a fraction (hawaii is 15 min), add minutes to the time string
-        if ts_int%1 > 0:
-            df_parts.loc[i,'ts_hr_string'] = 'tm' + str(ts_hr).zfill(2) + str(ts_min).zfill(2)
-        
-    return df_parts
-    
-
-def get_latest_ana_fileparts(start_time, n_hours, ts_int, df_parts, include_t0, domain):
-    '''
-    Build a dataframe of filename parts, determining which AnA configuration (standard or extended) 
-    is the best/most recent available that corresponds to each valid time in the most recent evaluatable forecast 
-    (e.g. issued 20 hours earlier for short range - 18 hours plus 2 hour latency)
-    
-    *Note currently only works to combine extended and standard AnA for 1-hour timestep
-    '''
-    
-    # get the start datetime of the aligning forecast
-    # include t0 or not based on include_t0 argument
-    if include_t0:
-        end_time = start_time + timedelta(hours=n_hours)
-    else:
-        end_time = start_time + timedelta(hours=n_hours)
-        start_time = start_time + timedelta(hours=1)
-        
-    n_hours_back = n_hours
-    #start_time = end_time - timedelta(hours=n_hours_back)
-
-    # get the valid times (time on the ground) between start_time/end_time
-    # e.g. for comparison to SRF issued 18-hrs prior, get ref_time (18 hours ago) plus 18 hours
-    val_times = pd.date_range(start=start_time, end=end_time, freq='H')    
-
-    # get number of datetimes (number of filenames being generated)
-    n_files = len(val_times)
-    
-    # update the val_times column
-    df_parts['val_time'] = val_times
-    
-    # last 3 files are always most recent standard AnA
-    config = 'analysis_assim'    
-    for i in np.arange(n_files-3,n_files):
-    
-        df_parts.loc[i,'datedir'] = end_time.strftime("nwm.%Y%m%d")
-        df_parts.loc[i,'ref_hr_string'] = 't' + end_time.strftime("%Hz")   
-        df_parts.loc[i,'ts_hr_string'] = 'tm' + str(n_files - i - 1).zfill(2)
-        df_parts.loc[i,'config'] = config      
-        
-    # the algorithm below determines which timesteps have an extended AnA value available
-    #       for the valid time and which have only standard available
-    #       and determines which set of output (which date for extana) the valid time is part of
-
-    # keep track of the timestep hour of extended to know when to switch dates
-    ext_ts_hour = 0
-    
-    # starting with 4th to last timestep (prior to most recent std AnA run), work backwards
-    for i in range(n_files-4,-1,-1):
-
-        # ivt short for ith valid time
-        ivt = val_times[i]
-        vt_date = datetime(ivt.year, ivt.month, ivt.day, 0, 0, 0)
-        vt_hour = ivt.hour
-        
-        # if the valid time hour hits 16, the last run ext-ana is available 
-        if config == 'analysis_assim' and vt_hour == 16:
-            config = 'analysis_assim_extend'
-            ext_ts_hour = 0
-               
-        df_parts.loc[i,'config'] = config   
-            
-        # if the valid time is pulling from standard, use tm02 from ref time 2 hours ahead
-        # currently hard-coded here to use tm02 only for all timesteps prior to most recent avail std AnA
-        if config == 'analysis_assim':
-            data_time = ivt + timedelta(hours = 2)
-            std_ts_hour = 2
-       
-            df_parts.loc[i,'ts_hr_string'] = 'tm' + str(np.int(std_ts_hour)).zfill(2)
-            
-        # if pulling from an extended ana run, figure out which date and timestep
-        else:
-            if ext_ts_hour < 17:
-                data_time = datetime(ivt.year, ivt.month, ivt.day, 16, 0, 0)
-            else:
-                data_time = datetime(ivt.year, ivt.month, ivt.day+1, 16, 0, 0)              
-          
-            df_parts.loc[i,'ts_hr_string'] = 'tm' + str(np.int(ext_ts_hour)).zfill(2)
-
-            if ext_ts_hour == 27:
-                ext_ts_hour = 4
-            else:
-                ext_ts_hour += 1    
-                
-        # update filename parts dataframe 
-        df_parts.loc[i,'datedir'] = data_time.strftime("nwm.%Y%m%d")
-        df_parts.loc[i,'ref_hr_string'] = 't' + data_time.strftime("%Hz")   
-        
-                
-    return df_parts
-   
-
-def get_simple_ana_fileparts(ref_time, n_hours, df_parts, ts_int):
-    '''
-    straightforward filenames for all timesteps of a given AnA config
-    '''   
-    
-    for i in range(0, n_hours, ts_int): # (0 through n_hours, incrementing by ts_int)
-
-        df_parts.loc[i,'datedir'] = ref_time.strftime("nwm.%Y%m%d")
-        df_parts.loc[i,'ref_hr_string'] = 't' + ref_time.strftime("%Hz")     
-        
-        ts_hr = i
-
-        # fill in ts_hr_string
-        df_parts.loc[i,'ts_hr_string'] = "tm" + str(ts_hr).zfill(2)        
-
-    df_parts = df_parts.iloc[::-1]
-
-    return df_parts 
-    
-    
-def add_no_da_to_filelist(filelist):
-    '''
-    Add the 'no_da' extension to the config directory and filename for a list of filepaths
-    '''    
-    
-    new_filelist = []
-    
-    if filelist:
-        for path in filelist:
-        
-            parts = path.name.split(".")
-            parts[2] = parts[2] + "_no_da"
-            new_filename = ".".join(parts)
-            
-            new_path = path.parent.parent / (path.parent.name + '_no_da') / new_filename
-            
-            new_filelist.append(new_path)
-
-    return new_filelist 
-    
-def get_filelist_chunks_by_df(df_filelists, n = 24, include_t0 = True):
-    '''
-    run the filelist chunker for multiple filelists
-    '''
-    
-    df_filelists_chunks = pd.DataFrame()
-    
-    for index, row in df_filelists.iterrows():
-    
-        filelist = row['filelist']
-        filelist_chunks, n_chunks = get_filelist_chunks(filelist, n, include_t0 = include_t0)
-        
-        df_filelists_chunks = df_filelists_chunks.append([pd.DataFrame({'filelist_chunks' : [filelist_chunks]},
-                                                                      index = [index])])
-    
-    df_filelists = pd.concat([df_filelists, df_filelists_chunks], axis = 1)
-    
-    return df_filelists, n_chunks
-    
-    
-def get_filelist_chunks(filelist, n = 24, include_t0 = True):
-    '''
-    Split a list of filenames into chunks containing n files each.
-    If include_t0 = True, include a 't0' file (last file from prior chunk) in order to
-       calculate some necessary metrics, e.g., rate of rise
-    '''
-
-    # number of timesteps
-    nts = len(filelist)
-
-    if nts > n:
-    
-        # if include_t0 = True, start chunking at t1 and 
-        # append last timestep of prior chunk to each list;
-        # first chunk will append the true t0  
-        # otherwise start chunking at t0        
-        if include_t0:
-            filelist_chunks = [filelist[i-1:i+n] if i+n <= nts else filelist[i-1:nts] \
-                               for i in range(1,nts,n)]                
-        else:        
-            filelist_chunks = [filelist[i:i+n] if i+n <= nts else filelist[i:nts] \
-                               for i in range(0,nts,n)]
-                     
-        n_chunks = len(filelist_chunks)
-            
-    else:
-    
-        filelist_chunks = [filelist]
-        n_chunks = 1
-
-    return filelist_chunks, n_chunks
-    
-    
-def parse_nwm_filelist(filelist):
-    '''
-    Parse out filename parts from a list of nwm filepaths and store as separate columns in a dataframe
-    '''
-
-    date = [path.parents[1].name for path in filelist]
-    ref_hr =  [path.name.split(".")[1] for path in filelist]
-    reftimes = [datetime.strptime(d, 'nwm.%Y%m%dt%Hz') for d in list(map(str.__add__, date, ref_hr))]
-    ts = [path.name.split(".")[-3] for path in filelist]
-    config = [path.name.split(".")[2] for path in filelist]
-    variable = [path.name.split(".")[3] for path in filelist]
-    domain = [path.name.split(".")[-2] for path in filelist]
-    
-    df = pd.DataFrame({'reftime' : reftimes, "ts" : ts, 'config' : config, 'variable' : variable, 'domain' : domain})   
-    
-    # add valid times
-    df['val_time'] = -999
-
-    for i in range(len(df)):
-        ref_time = df.loc[i, 'reftime']
-        ts_str = df.loc[i, 'ts']
-        if ts_str[0:2] == 'tm':
-            hr_add = -1 * int(ts_str[2:])
-        else:
-            hr_add = int(ts_str[2:])           
-        val_time = ref_time + timedelta(hours = hr_add)        
-        df.loc[i,'val_time'] = val_time    
-    
-    return df
-
-
-def get_alt_ana_filelist(filelist):
-    '''
-    switch a filelist from one config (e.g. ExtAnA) for another (AnA) for same valid times
-    '''
-    
-    subset = False
-    df = parse_nwm_filelist(filelist)
-    
-    # first check if the filelist contains forecasts or AnA, if not, return empty list
-    config = df.loc[0, 'config']
-    if config in ['short_range','medium_range']:
-        return []
-    
-    filelist_alt = []
-    for i in range(len(df)):
-        
-        val_time = df.loc[i, 'val_time']
-        variable = df.loc[i, 'variable']
-        config = df.loc[i, 'config']
-        if config == 'analysis_assim_extend':
-            alt_config = 'analysis_assim'
-        elif config == 'analysis_assim':
-            alt_config = 'analysis_assim_extend'
-            
-        if variable[-6:] == 'subset':
-            subset = True
-            variable = variable[:-7]
-
-        if variable[:11] == 'channel_rt':
-            variable = 'channel'
-        n_files = 1
-        
-        if i == 0:
-            version = admin.nwm_version(val_time)
-            domain = df.loc[i, 'domain']
-                   
-        df_parts = pd.DataFrame(
-            {"datedir" : np.full(n_files, val_time.strftime("nwm.%Y%m%d")),
-             "ref_hr_string" : np.full(n_files, 't00z'),
-             "config" : np.full(n_files, alt_config),
-             "ts_hr_string" : np.full(n_files, 'tm00'),
-             "val_time" : np.full(n_files, val_time)},
-             index = np.arange(n_files))    
-        
-        df_parts = get_ana_fileparts(val_time, alt_config, n_files, 1, df_parts, True)
-        filename = build_filelist_from_parts(domain, version, alt_config, variable, df_parts)
-        
-        if subset:
-            filename_add = [raw.get_subset_path(filename[0])]
-        else:
-            filename_add = filename
-        
-        filelist_alt = filelist_alt + filename_add
-    
-    return filelist_alt
-
-    
-    
-def parse_nwm_path(nwm_path):
-    '''
-    Parse out filename parts from a single nwm filepath
-    '''
-
-    date = nwm_path.parents[1].name
-    ref_hr =  nwm_path.name.split(".")[1]
-    ref_time = datetime.strptime(date + ref_hr, 'nwm.%Y%m%dt%Hz')
-    ts = nwm_path.name.split(".")[-3]
-    config = nwm_path.name.split(".")[2]
-    
-    return ref_time, ts, config
-    
-
-def parse_ts_from_path(nwm_path):
-    '''
-    Parse out timestep number as integer for the file with index i
-    '''
-
-    ref_time, ts, config = parse_nwm_path(nwm_path)
-    
-    if ts[0] == 't':    # tmxx
-        t = -1 * int(ts[2:])
-    else:               # fxxx
-        t = int(ts[1:])
-
-    return t
-    
-    
-def parse_valtime_from_path(nwm_path):
-    '''
-    Parse out timestep number as integer for the file with index i
-    '''
-
-    ref_time, ts, config = parse_nwm_path(nwm_path)
-    
-    if ts[0] == 't':    # tmxx
-        t = -1 * int(ts[2:])
-    else:               # fxxx
-        t = int(ts[1:])
-        
-    val_time = ref_time + timedelta(hours = t)        
-
-    return val_time
\ No newline at end of file
+''' 
+Collection of utilities to work with NWM raw data files for evaluations.  
+Including generating lists of NWM files needed to build timeseries
+'''
+
+import re
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from itertools import product
+from pathlib import Path
+
+from . import admin, reftime, raw
+
+# forecast timestep strings for whole-hour timesteps, indexed by hour (f000-f999)
+FCST_HR_STRINGS = tuple(f"f{hr:03d}" for hr in range(1000))
+
+# NWM filename, e.g. 'nwm.t06z.short_range.channel_rt.f001.conus.nc'
+NWM_FILENAME_RE = re.compile(r"nwm\.t(?P<ref_hr>\d{2})z\.(?P<config>[^.]+)\.(?P<variable>[^.]+)"
+                             r"(?:\..*)?\.(?P<ts>(?:tm|f)\d+)\.(?P<domain>[^.]+)\.\w+$")
+
+# timedelta constants used in the fileparts loops
+ONE_HOUR = timedelta(hours=1)
+TWO_HOURS = timedelta(hours=2)
+ONE_DAY = timedelta(days=1)
+
+# explicit column dtypes of the filename parts dataframes
+# (the string columns are left as object, build_filelist_from_parts reads them as object arrays)
+FILEPARTS_DTYPES = {"val_time" : "datetime64[ns]"}
+
+
+def get_eval_df_filelists(specs, variable, i = 0):
+    '''
+    get the dataframe of forecast and verifying filelists for an evaluation 
+    (shared by get_filelists and get_filelists_fcsts - build it once and pass it to both)
+    '''
+    
+    # when processing only a portion of the forecast, need to pass the partial duration into filelist methods
+    # for current eval_timing and latest_ana mode
+    if specs.fcst_config == 'medium_range' and specs.verif_config == 'latest_ana' and specs.eval_timing == 'current':
+        # for MRF with partial periods defined, there will be one reftime per store period, so reftime[i] matches store_period[i]
+        partial_duration = specs.store_periods[i]
+    else:
+        partial_duration = -999
+        
+    config_list = [specs.fcst_config, specs.verif_config]
+    
+    df_filelists = build_df_filelists(specs.domain, [variable], config_list, [specs.ref_time],
+                                      ana_align_to = specs.fcst_config, include_t0 = True, 
+                                      partial_duration = partial_duration)
+                                      
+    return df_filelists
+    
+
+def get_filelists(specs, variable, i = 0, df_filelists = None):
+    '''
+    create a dictionary of filelists for all requested evaluations, break into chunks if necessary
+     - if the dataframe of filelists was already built (see get_eval_df_filelists), pass it in
+    '''
+
+    # get the list(s) of NWM output files needed for this evaluation
+    if df_filelists is None:
+        df_filelists = get_eval_df_filelists(specs, variable, i)
+    
+    # If reading in more than 24 timesteps (e.g. med range), break filelist into chunks
+    # to avoid memory issues (n = chunk size in hours)
+    df_filelists, n_chunks = get_filelist_chunks_by_df(df_filelists, n = 24)
+    
+    # create df_filelist for each chunk and store in dictionary
+    dict_filelists = {}
+    dict_filelists_keep = {}
+    
+    if n_chunks > 1:
+    
+        # parse the verifying filelist (all chunks) once to get the max reference time in each chunk
+        verif_chunks = df_filelists['filelist_chunks'].iloc[1]
+        chunk_ids = np.repeat(np.arange(n_chunks), [len(c) for c in verif_chunks])
+        verif_reftimes = parse_nwm_filelist([file for c in verif_chunks for file in c])['reftime']
+        max_list_times = verif_reftimes.groupby(chunk_ids).max()
+        
+        # the dates cannot extend beyond the most recent AnA time
+        last_ana_valtime = reftime.get_most_recent_ana_valtime(specs)
+        
+        # metadata columns are the same for every chunk, only the filelist differs
+        meta = df_filelists.loc[:,:'variable'].copy()
+        
+        # matrix of filelist chunks (rows x chunks), filled element-wise so numpy 
+        # does not try to unpack the filelists themselves
+        chunks_matrix = np.empty((len(df_filelists), n_chunks), dtype = object)
+        for row, filelist_chunks in enumerate(df_filelists['filelist_chunks']):
+            for chunk, chunk_files in enumerate(filelist_chunks):
+                chunks_matrix[row, chunk] = chunk_files
+        
+        for chunk in range(n_chunks):
+            
+            # if the date list in this chunk is feasible, keep it
+            if chunk in max_list_times.index and max_list_times[chunk] <= last_ana_valtime:
+            
+                f = list(chunks_matrix[:, chunk])
+            
+                # key the dictionary from 1 to nchunks (1-based indexing)
+                dict_filelists[chunk + 1] = meta.assign(filelist = f)
+                
+        # remove any pointless chunks to save processing time - e.g. there is no point processing day 4 
+        # if not storing it and if day 5 cannot be processed because it goes beyond current clocktime
+        included_periods = set(specs.store_periods) & dict_filelists.keys()
+        if included_periods:
+            max_included_period = max(included_periods)
+            dict_filelists_keep = {key : df for key, df in dict_filelists.items() if key <= max_included_period}
+        else:
+            raise ValueError('None of the requested analysis periods are feasible for this reference time')
+            
+    else:
+        dict_filelists_keep[1] = df_filelists        
+       
+    return dict_filelists_keep
+
+
+def get_filelists_fcsts(specs, variable, i = 0, df_filelists = None):
+    '''
+    create and return a dataframe of filelists for all requested evaluations (not chunked)
+     - if the dataframe of filelists was already built (see get_eval_df_filelists), pass it in
+    '''
+
+    # get the list(s) of NWM output files needed for this evaluation
+    if df_filelists is None:
+        df_filelists = get_eval_df_filelists(specs, variable, i)
+    
+    return df_filelists
+    
+ 
+def build_df_filelists(domain, var_list, config_list, ref_time_list, val_start = -999, val_end = -999, 
+                       ana_align_to = 'none', include_t0 = False, use_no_da = False, partial_duration = -999):
+    '''
+    Create a dataframe of filelists and configuration specs for multiple configurations
+    Dataframe columns:
+        - ref_time      reference time
+        - config        NWM configuration (or 'latest_ana')
+        - variable      variable, channel or forcing
+        - filelist      list of all filenames for the ref time and configuration
+        - list_start    first datetime in the filelist
+        - list_end      last datetime in the filelist
+        
+    Parameters:
+    domain:             NWM geographic domain
+    var_list:           list of variables to generate filelists
+    config_list:        list of configurations to generate filelists
+    ref_time_list:      list of reference times to generate filelists
+    val_start:          first valid time to include in the list from each simulation, if -999 include all timesteps
+    val_end:            last valid time to include in the list from each simulation, if -999 include all timesteps
+    ana_align_to:       if ana config, define which forecast configuration timesteps to align to, if any
+    include_t0:         if forecast, include T0 or not
+    use_no_da:          if ana, use the no_da version or not
+    '''
+
+    # initialize lists of filelist dataframe rows and their indexes
+    rows = []
+    index = []
+     
+    # loop through all combinations of reference times, configurations, and variables 
+    # generating filelists (index is the position of the combination)
+    # - the valid times of the 'ana_align_to' forecast of each ref time are kept 
+    #   and passed to the AnA aligned to it (forecast configs come first in config_list)
+    print('')
+    fcst_val_times = {}
+    combos = product(ref_time_list, config_list, var_list)
+    for ind, (ref_time, config, variable) in enumerate(combos):
+
+        if config == ana_align_to:
+            filelist, fcst_val_times[ref_time] = build_one_filelist(domain, variable, config, ref_time = ref_time, 
+                                                                    val_start = val_start, val_end = val_end, 
+                                                                    include_t0 = include_t0,
+                                                                    use_no_da = use_no_da,
+                                                                    partial_duration = partial_duration,
+                                                                    return_val_times = True)
+        else:
+            filelist = build_one_filelist(domain, variable, config, ref_time = ref_time, 
+                                          val_start = val_start, val_end = val_end, 
+                                          ana_align_to = ana_align_to,
+                                          include_t0 = include_t0,
+                                          use_no_da = use_no_da,
+                                          partial_duration = partial_duration,
+                                          val_times = fcst_val_times.get(ref_time))
+
+        # append the list to dataframe rows if not empty
+        if filelist:
+        
+            rows.append({'ref_time' : ref_time,
+                         'config' : config, 
+                         'variable' : variable, 
+                         'filelist' : filelist})
+            index.append(ind)
+        else:
+            print('   ! No timesteps found within the event range for forecast: ',ref_time)
+                
+    # build the filelist dataframe once from all rows
+    df_filelists = pd.DataFrame(rows, index = index, columns = ['ref_time', 'config', 'variable', 'filelist'])
+        
+    return df_filelists  
+    
+    
+def build_one_filelist(domain, variable, config, ref_time = -999, val_start = -999, val_end = -999,
+                       ana_align_to = 'none', include_t0 = False, use_no_da = False, partial_duration = -999,
+                       val_times = None, return_val_times = False):
+    '''
+    Build a single filelist based on single domain, variable, config, and reftime
+    See build_df_filelists for description of parameters
+     - val_times: valid times of all timesteps of the 'ana_align_to' forecast (DatetimeIndex), if already 
+       built, used for an AnA aligned to it rather than rebuilding them (if they match its timesteps)
+     - if return_val_times is True, also return the valid times of all timesteps (before limiting to 
+       the valid range) as a DatetimeIndex
+    '''
+                       
+    # get version based on ref_time
+    if ref_time != -999:
+        version = admin.nwm_version(ref_time)
+    elif val_start != -999:
+        version = admin.nwm_version(val_start)
+    else:
+        raise ValueError(f"no valid date:  ref time = {ref_time} and valid time = {val_start}")
+     
+    # if config = 'latest_ana' (mix of std and ext ana) use standard ana to get configuration settings
+    # but set flag (orig_config) to trigger 'latest_ana' method for AnA timestep selection  
+    passed_config = config   
+    if config == 'latest_ana':
+        config = 'analysis_assim'
+
+    # for Std AnA, flag to use tm02 rather than tm00 when piecing together time series
+    # (hard-coding for now until becomes apparent it needs to be an argument)
+    use_tm02 = True
+        
+    # get config info
+    config_spec = admin.config_spec(config, domain, version)
+    
+    # get duration, time interval and whether it is a forecast 
+    # (flag for "f" versus "tm")
+    is_forecast = config_spec.is_forecast    
+    ts_int = config_spec.timestep_int
+    n_hours = config_spec.duration_hrs
+    
+    if partial_duration > 0:
+        n_hours = partial_duration * 24
+
+    # initialize the datedir (and ref_time if none provided)
+    if ref_time == -999:
+       ref_time = val_start 
+    datedir = ref_time.strftime("nwm.%Y%m%d")  # ref date directory   
+      
+    # Set date range if not defined for AnA, set to
+    # to the duration of the duration_config
+    if not is_forecast and val_start == -999:
+        # for ana, if val_start/end are -999, dates are based on 'ana_align_to' forecast config
+        # if 'ana_align_to' is not set, default to short range
+        if ana_align_to == 'none':
+            ana_align_to = 'short_range'          
+        n_hours = admin.config_spec(ana_align_to, domain, version).duration_hrs
+        
+        if partial_duration > 0:
+            n_hours = partial_duration * 24
+   
+    # if forecast, run the forecast fileparts function   
+    if is_forecast:
+        df_parts, list_start, list_end = build_forecast_fileparts(ref_time, config, n_hours, ts_int, 
+                                                                  include_t0, val_start, val_end)                                                    
+    
+    # if AnA, fileparts function varies based on whether or not a valid time range is defined (val_start/end = -999)
+    else:
+        # if no valid time range is defined (val_start/end = -999), dates are selected based on 'ana_align_to' forecast duration
+        if val_start == -999:
+            # if 'ana_align_to' is not set, default to short range to get duration
+            if ana_align_to == 'none':
+                ana_align_to = 'short_range'          
+                n_hours = admin.config_spec(ana_align_to, domain, version).duration_hrs  
+                
+                if partial_duration > 0:
+                    n_hours = partial_duration * 24
+
+            # get filename parts for an ana config aligned to a specified forecast config and ref time
+            df_parts, list_start, list_end = build_ana_fileparts_aligned_to_forecast(ref_time, passed_config, n_hours, ts_int, include_t0, domain,
+                                                                                     val_times = val_times)
+            
+        else:
+            # if valid time range was defined, get filename parts for ana config within the valid range
+            df_parts, list_start, list_end = build_ana_fileparts_defined_range(val_start, val_end, ts_int, passed_config, domain)
+  
+    # console messages 
+    if val_start != -999:
+        print ("Building file list for", config, variable,"| reference time:", ref_time, "| valid time range:", val_start, "to", val_end)
+    else:
+        print ("Building file list for", config, variable,"| reference time:", ref_time, "| all timesteps")          
+       
+    # build the filelist from the parts within the requested range
+    # (suffixes are not added to the T0 file on a forecast, i.e., AnA file, while rest are fcst files)
+    filelist = build_filelist_from_parts(domain, version, config, variable, df_parts, 
+                                         list_start = list_start, list_end = list_end, fcst_config = config)
+    count = len(filelist)
+                
+    # console messages
+    if not filelist:
+        print('   No timesteps found in range', val_start, 'to', val_end)
+    else:
+        if val_start != -999:
+            print('   ',count, 'timesteps found in range', val_start, 'to', val_end)     
+    
+    # if using no_da, add no_da string to the filenames
+    if use_no_da:
+        filelist = add_no_da_to_filelist(filelist)
+        
+    if return_val_times:
+        return filelist, pd.DatetimeIndex(df_parts['val_time'])
+ 
+    return filelist
+    
+   
+def build_filelist_by_reftime(domain, variable, config, ref_time, use_no_da = False):
+    '''
+    Build a nwm filelist of all files associated with a nwm domain, variable, config, and reftime
+
+    Parameters:
+    domain:             NWM geographic domain
+    variable:           variable - channel or forcing
+    config:             NWM configuration ('short_range','medium_range','analysis_assim_extend',
+                                           'analysis_assim','latest_ana')
+    ref_time:           forecast (or ana) reference time
+    use_no_da:          if ana, use the no_da version or not
+    '''
+                       
+    # get version based on ref_time
+    version = admin.nwm_version(ref_time)
+        
+    # get config info
+    config_spec = admin.config_spec(config, domain, version)
+    
+    # get duration, time interval and whether it is a forecast 
+    # (flag for "f" versus "tm")
+    is_forecast = config_spec.is_forecast    
+    ts_int = config_spec.timestep_int
+    n_hours = config_spec.duration_hrs
+
+    # initialize the datedir (and ref_time if none provided)
+    datedir = ref_time.strftime("nwm.%Y%m%d")  # ref date directory   
+      
+    # get a dataframe of the filename parts for the defined nwm config
+    df_parts = build_reftime_fileparts(ref_time, config, n_hours, ts_int, is_forecast)                            
+
+    member_str = ""
+    if config == 'medium_range':
+        member_str = "| member " + str(member) 
+
+    print ("---Building file list for", config, variable,"| reference time:", ref_time, "| all timesteps",  member_str)          
+       
+    # build the filelist from all the parts
+    filelist = build_filelist_from_parts(domain, version, config, variable, df_parts)   
+        
+    if use_no_da:
+        filelist = add_no_da_to_filelist(filelist)
+ 
+    return filelist
+
+
+def get_filelist_start_end(ref_time, config, n_hours, ts_int, is_forecast = True,
+                           include_t0 = False, val_start = -999, val_end = -999):
+                       
+    '''
+    Get the start and end datetimes of a list of files for specific specs
+    '''
+                            
+    # Get the forecast start and end datetime.  
+    # First getting list of all files for the forecast, later will keep only those in the valid range 
+    # Include T0 (from standard AnA) based on argument
+
+    if is_forecast:
+    
+        forecast_end = ref_time + timedelta(hours=n_hours)  
+        
+        if include_t0:
+            forecast_start = ref_time           
+            n_files = int(n_hours/ts_int + 1)
+        else:
+            forecast_start = ref_time + timedelta(hours=ts_int)
+            n_files = int(n_hours/ts_int)           
+
+    else:
+        forecast_start = ref_time - timedelta(hours=n_hours-1)  
+        forecast_end = ref_time
+
+    # initialize the start and end dates of the filelist
+    # if a range of valid times to use was not defined, include all timesteps of the forecast    
+    if val_start == -999:
+        list_start = forecast_start
+        list_end = forecast_end       
+    else:
+        list_end = val_end
+        list_start = val_start       
+        
+    print(n_files, ts_int, forecast_start)
+        
+    return list_start, list_end
+ 
+ 
+def build_filelist_from_parts(domain, version, config, variable, df_parts, list_start = -999, list_end = -999,
+                              fcst_config = None):
+    '''
+    Build a list of filenames from a dataframe of the filename parts
+     - if fcst_config is defined, suffixes are only added to files of that config
+       (e.g. not to the T0 AnA file of a forecast)
+    '''
+
+    # get config and variable info
+    config_spec = admin.config_spec(config, domain, version)
+    var_spec = admin.variable_spec(variable, domain)
+
+    # base configuration directory prefix (e.g. 'forcing')
+    dir_prefix = var_spec.dir_prefix
+    
+    # variable string used in filename ('forcing' or 'channel_rt' for now)
+    var_string_stem = var_spec.var_string    
+
+    # base configuration directory suffix (e.g. 'mem1' for medium_range ensemble member 1)    
+    dir_suffix = config_spec.dir_suffix
+
+    # suffix at the end of the variable name (e.g. '1' for medium_range ensemble mem1)
+    var_str_suffix = config_spec.var_str_suffix
+
+    # flag to trigger using suffixes or not (for forcing or hawaii)
+    use_suffix = var_spec.use_suffix   
+    
+    # include each file in the list only if it's valid time falls within the requested range (if range defined)
+    # (val_time is datetime64, so compare to Timestamps for a vectorized comparison)
+    if list_start != -999 and list_end != -999:
+        val_times = df_parts['val_time'].to_numpy()
+        df_parts = df_parts[(val_times >= pd.Timestamp(list_start).to_datetime64()) 
+                            & (val_times <= pd.Timestamp(list_end).to_datetime64())]
+        
+    # add prefix and suffixes as needed, using a mask of the files getting suffixes
+    # (if fcst_config is defined, only files of that config)
+    configs = df_parts['config'].to_numpy(dtype = object)
+    if fcst_config is None:
+        add_suffix = np.full(len(configs), bool(use_suffix))
+    else:
+        add_suffix = use_suffix & (configs == fcst_config)
+    config_dirs = np.where(add_suffix, dir_prefix + configs + dir_suffix, dir_prefix + configs)
+    var_strings = np.where(add_suffix, var_string_stem + var_str_suffix, var_string_stem).astype(object)
+        
+    # build the filenames
+    filenames = ('nwm.' + df_parts['ref_hr_string'].to_numpy(dtype = object) + '.' + configs + '.' + var_strings
+                 + '.' + df_parts['ts_hr_string'].to_numpy(dtype = object) + '.' + domain + '.nc')
+            
+    # build the full paths as strings, then convert to Paths
+    paths = df_parts['datedir'].to_numpy(dtype = object) + '/' + config_dirs + '/' + filenames
+    filelist = list(map(Path, paths))
+ 
+    return filelist    
+
+
+def build_reftime_fileparts(ref_time, config, n_hours, ts_int, is_forecast = True, include_t0 = False):
+    '''
+    Build dataframe of filename parts for a specific reference time
+    '''
+    
+    if include_t0 and is_forecast:
+        n_files = int(n_hours/ts_int + 1)
+    else:
+        n_files = int(n_hours/ts_int)
+        
+    #### Get filename parts for all files associated with the config and reference time
+    if is_forecast:
+        df_parts = get_forecast_fileparts(ref_time, n_files, config, ts_int, False)   
+    else:
+        df_parts = get_simple_ana_fileparts(ref_time, config, n_hours, ts_int)
+    
+    return df_parts    
+    
+    
+def build_forecast_fileparts(ref_time, config, n_hours, ts_int, include_t0, val_start, val_end):
+    '''
+    Build dataframe of filename parts for a forecast configuration
+    '''
+
+    # Get the forecast start and end datetime.  
+    # First getting list of all files for the forecast, later will keep only those in the valid range 
+    # Include T0 (from standard AnA) based on argument
+    if include_t0:
+        forecast_start = ref_time
+        n_files = int(n_hours/ts_int + 1)
+    else:
+        forecast_start = ref_time + timedelta(hours=ts_int)
+        n_files = int(n_hours/ts_int)
+        
+    forecast_end = ref_time + timedelta(hours=n_hours)     
+
+    # initialize the start and end dates of the filelist
+    list_end = val_end
+    list_start = val_start    
+
+    # if a range of valid times to use was not defined, include all timesteps of the forecast
+    if val_start == -999:
+        list_start = forecast_start
+        list_end = forecast_end                  
+    
+    # check if the end of the forecast is before the end of the valid range
+    # (if so, results will be plotted differently in AAR plots)
+    if forecast_end < list_end:
+        list_end = forecast_end
+        
+    # check if the start of the forecast is after the start of the valid range
+    if ref_time > list_start:
+        list_start = ref_time + timedelta(hours=ts_int)
+        
+    #### Get filename parts for all files associated with the config and reference time
+    df_parts = get_forecast_fileparts(ref_time, n_files, config, ts_int, include_t0)   
+    
+    return df_parts, list_start, list_end
+    
+
+def get_timestep_val_times(ref_time, n_files, ts_int, include_t0):
+    '''
+    Get the valid times of n_files timesteps at ts_int hours from a reference (or start) time 
+    '''
+    
+    # if T0 is included, it is the first file, otherwise the first file is one timestep later
+    if include_t0:
+        ts_hr = np.arange(n_files) * ts_int
+    else:
+        ts_hr = (np.arange(n_files) + 1) * ts_int
+        
+    return pd.Timestamp(ref_time) + pd.to_timedelta(ts_hr, unit = 'h')
+    
+    
+def get_forecast_fileparts(ref_time, n_files, config, ts_int, include_t0):
+    '''
+    Get filename parts for a forecast configuration
+    '''   
+ 
+    # timestep hours of each file relative to the ref_time
+    # if T0 is included, it is the first file (i=0), otherwise the first file is i=1
+    if include_t0:
+        ts_hr = np.arange(n_files) * ts_int
+    else:
+        ts_hr = (np.arange(n_files) + 1) * ts_int
+        
+    # create the forecast time step strings
+    # if ts_int is a fraction (hawaii is 15 min), add minutes to the time string
+    if ts_int%1 > 0:
+        ts_hr_string = list(np.char.add(np.char.add('f', np.char.zfill(np.floor(ts_hr).astype(int).astype(str), 3)),
+                                        np.char.zfill((ts_hr%1*60).astype(int).astype(str), 2)))
+    else:
+        ts_hr_string = [FCST_HR_STRINGS[hr] for hr in ts_hr.astype(int)]
+        
+    configs = [config] * n_files
+    
+    # T0 comes from standard AnA tm00
+    if include_t0:
+        configs[0] = 'analysis_assim'
+        if ts_int%1 > 0:
+            ts_hr_string[0] = 'tm0000'
+        else:
+            ts_hr_string[0] = 'tm00'
+
+    # build the filename parts - date directory and reference time string are the same for all files
+    df_parts = pd.DataFrame(
+            {"datedir" : ref_time.strftime("nwm.%Y%m%d"),
+             "ref_hr_string" : 't' + ref_time.strftime("%Hz"),
+             "config" : configs,
+             "ts_hr_string" : ts_hr_string,
+             "val_time" : get_timestep_val_times(ref_time, n_files, ts_int, include_t0)},
+             index = np.arange(n_files)).astype(FILEPARTS_DTYPES)
+             
+    return df_parts  
+    
+    
+def build_ana_fileparts_aligned_to_forecast(ref_time, config, n_hours, ts_int, include_t0, domain, val_times = None):
+    '''
+    Build a dataframe of filename parts for an AnA configuration aligned with the valid times of a 
+    specified forecast configuration
+     - if the valid times of the forecast are passed in (and match the AnA timesteps), they are used 
+       rather than rebuilt
+    '''
+    
+    #print('n_hours', n_hours)
+    
+    # get the start datetime of the aligning forecast
+    # include t0 or not based on include_t0 argument
+    if include_t0:
+        forecast_start = ref_time
+        n_files = int(n_hours/ts_int + 1)
+    else:
+        forecast_start = ref_time + timedelta(hours=ts_int)
+        n_files = int(n_hours/ts_int)
+    
+    # get the end datetime of the aligning forecast
+    forecast_end = ref_time + timedelta(hours=n_hours)          
+    
+    # the start and end dates of the filelist is the full forecast duration in this case
+    list_start = forecast_start
+    list_end = forecast_end    
+    
+    # forecast valid times match the AnA timesteps only if the timestep interval is the same
+    if val_times is not None and (len(val_times) != n_files or val_times[0] != forecast_start):
+        val_times = None
+            
+    # Get filename parts for all AnA files corresponding to the valid time range
+    if config == 'latest_ana':
+        # if latest_ana and domain is conus, use the latest_ana_fileparts function 
+        # (only works for conus, where there is an extended ana configuration)
+        if domain == 'conus':
+            df_parts = get_latest_ana_fileparts(ref_time, n_hours, ts_int, include_t0, domain)
+            
+        # for other domains use the ana_fileparts function with is_latest flag set to True
+        else:
+            df_parts = get_ana_fileparts(ref_time, config, n_files, ts_int, include_t0, is_latest = True,
+                                         val_times = val_times)
+
+    else:
+        # for standard and extended-only configs, use the get_ana_fileparts function (is_latest=False by default)
+        df_parts = get_ana_fileparts(ref_time, config, n_files, ts_int, include_t0, val_times = val_times)
+        
+    return df_parts, list_start, list_end
+       
+    
+def build_ana_fileparts_defined_range(val_start, val_end, ts_int, config, domain):
+    '''
+    Build a dataframe of filename parts for an AnA configuration within a specified
+    valid start/end time
+    '''
+
+    # for a defined date range, include_t0 is always True
+    include_t0 = True    
+    
+    # n_hours is the hours between and including start/end dates
+    delta = val_end - val_start
+    n_hours = int(delta.total_seconds() / 3600) + 1
+    if ts_int == 1:
+        n_files = n_hours
+    else:
+        n_files = int(n_hours/ts_int + 1)
+    
+    # the start and end dates of the filelist match the defined range in this case
+    list_end = val_end
+    list_start = val_start  
+            
+    # Get filename parts for all AnA files corresponding to the valid time range
+    if config == 'latest_ana':
+        # if latest_ana and domain is conus, use the latest_ana_fileparts function 
+        # (only works for conus, where there is an extended ana configuration)
+        if domain == 'conus':
+            # to make this work, need to subtract 1 from n_hours, it will be added back in this function if 
+            # include_t0 = True, which is always is here
+            df_parts = get_latest_ana_fileparts(val_start, n_hours-1, ts_int, include_t0, domain)
+            
+        # for other domains use the ana_fileparts function with is_latest flag set to True
+        else:
+            df_parts = get_ana_fileparts(val_start, config, n_files, ts_int, include_t0, is_latest = True)
+            
+    else:
+        # if straightforward AnA (standard or extended) use ana_fileparts
+        df_parts = get_ana_fileparts(val_start, config, n_files, ts_int, include_t0)
+        
+    return df_parts, list_start, list_end  
+    
+
+def format_datedir(dt):
+    '''
+    NWM date directory string of a datetime, e.g. 'nwm.20220601' (faster than strftime)
+    '''
+    
+    return f"nwm.{dt.year:04d}{dt.month:02d}{dt.day:02d}"
+    
+    
+def format_ref_hr(dt):
+    '''
+    NWM reference hour string of a datetime, e.g. '06z' (faster than strftime)
+    '''
+    
+    return f"{dt.hour:02d}z"
+    
+
+def get_ext_ana_offsets(val_hours, val_days, cutoff_day):
+    '''
+    get the date directory offset (0 = same date, 1 = next date) and timestep hour (tmXX) 
+    of the 16z e-AnA file containing each valid time (integer arrays, in and out)
+     - val_days and cutoff_day are day numbers, the next date's e-AnA is not yet 
+       available for valid days after the cutoff day
+    '''
+    
+    #Valid hours 0-12 --> align with tm16-tm04 in same date directory
+    #Valid hours 13-23 --> align with tm27-tm17 in next date directory    
+    next_day = val_hours >= 13
+    
+    # if nextday not yet available, fill in tm03-00 from current day
+    # if the ts_hr would be negative, use next day - will be missing but keep in the filelist
+    next_day = next_day & ~((val_days > cutoff_day) & (val_hours <= 16))
+    
+    ts_hrs = np.where(next_day, 40 - val_hours, 16 - val_hours)
+    
+    return next_day.astype(int), ts_hrs
+    
+
+def get_ana_fileparts(start_time, config, n_files, ts_int, include_t0, use_tm02 = True, is_latest = False,
+                      val_times = None):
+    '''
+    Build a dataframe of filename parts for an AnA configuration based on argument specifications
+     - if val_times (DatetimeIndex of n_files valid times) is passed in, it is used rather than 
+       timesteps from the start time (e.g. for a filelist of arbitrary valid times)
+    '''
+    
+    #get current clock time to check if "next day AnA" is available yet
+    clock_ztime = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0, minute=0)    
+    
+    # the next day's 19z (16z e-AnA plus latency) is after the clock time if the valid date 
+    # is after the date 43 hours before the clock time (e-AnA is hourly, so valid times are top of the hour)
+    ext_cutoff_day = np.datetime64(clock_ztime - timedelta(hours=43), 'D').astype(int)
+
+    # get the valid times of all timesteps relative to the start time
+    # when T0 not included (will only occur when aligning with a forecast), shifted forward one timestep
+    # (same valid times as the aligned forecast, if the timestep interval matches)
+    if val_times is None:
+        val_times = get_timestep_val_times(start_time, n_files, ts_int, include_t0)
+    
+    if config == "analysis_assim_extend":
+    
+        #e-AnA only runs in 16z cycle, get all output from this ref-time, either current or next date
+        # - the date/timestep selection is integer math on the valid hours/days, so is done for 
+        #   all timesteps at once
+        val_days = val_times.to_numpy().astype('datetime64[D]').astype(int)
+        day_offsets, ts_hrs = get_ext_ana_offsets(val_times.hour.to_numpy(), val_days, ext_cutoff_day)
+        
+        datedirs = (val_times + pd.to_timedelta(day_offsets, unit = 'D')).strftime('nwm.%Y%m%d')
+        ref_hr_strings = 't16z'
+        ts_mins = np.zeros(n_files, dtype = int)
+    
+    else:
+    
+        # many timesteps share a date, so format each date directory only once
+        datedirs_by_day = {}
+        def get_datedir(dt):
+            day = dt.toordinal()
+            if day not in datedirs_by_day:
+                datedirs_by_day[day] = format_datedir(dt)
+            return datedirs_by_day[day]
+    
+        # filename parts of each timestep are collected in lists, then the dataframe is built once
+        datedirs = [None] * n_files
+        ref_hr_strings = [None] * n_files
+        ts_hrs = np.zeros(n_files, dtype = int)
+        ts_mins = np.zeros(n_files, dtype = int)
+
+        for i in range(n_files):
+    
+            # get the valid time of the timestep for this iteration
+            val_time = val_times[i] # calendar date/time of forecast timestep
+
+            #standard AnA runs every cycle, if get_tm02 = True, use tm02 from ref_time + 2, else use tm00 from ref-time
+            if use_tm02:
+                datedir = get_datedir(val_time + TWO_HOURS)
+                ref_hr_string = format_ref_hr(val_time + TWO_HOURS)
+                ts_hr = 2
+                
+                # minutes for the time string, only used if ts_int is a fraction (hawaii is 15 min)
+                val_minutes = val_time.minute
+                if val_minutes > 0:
+                    ts_mins[i] = 60 - val_minutes
+                
+                # if building most recent possible filelist, end with T0
+                if is_latest:
+                
+                    # 2nd to last file is T1 of most recent available reftime
+                    if i >= (n_files - (1/ts_int) - 1):                      
+                        datedir = get_datedir(val_time + ONE_HOUR)
+                        ref_hr_string = format_ref_hr(val_time + ONE_HOUR)                      
+                        ts_hr = 1
+   
+                    # last file is T0 of most recent available reftime
+                    if i == n_files - 1:
+                        datedir = get_datedir(val_time)
+                        ref_hr_string = format_ref_hr(val_time)
+                        ts_hr = 0    
+                
+                # if valid time is not top of the hour, need to subtract an hour to get the 
+                # corresponding AnA timestep string, since they increase going backward in time
+                if val_minutes > 0:
+                    ts_hr = ts_hr - 1
+                
+            # if get_tm02 is False, use the t00 from each standard AnA (currently never used)
+            # ** this option does not yet work if timestep interval (ts_int) is < 1 hour
+            else:
+                datedir = get_datedir(val_time)
+                ref_hr_string = format_ref_hr(val_time)
+                ts_hr = 0
+                  
+            # update filename parts lists
+            datedirs[i] = datedir
+            ref_hr_strings[i] = 't' + ref_hr_string    
+            ts_hrs[i] = ts_hr
+            
+    # build the time step strings, with the minutes if ts_int is a fraction
+    ts_hr_strings = np.char.add('tm', np.char.zfill(ts_hrs.astype(str), 2))
+    if ts_int%1 > 0:
+        ts_hr_strings = np.char.add(ts_hr_strings, np.char.zfill(ts_mins.astype(str), 2))
+            
+    # if using this function to get the latest AnA, the config is always standard AnA 
+    if is_latest:
+        config = 'analysis_assim'
+        
+    # build the filename parts dataframe
+    df_parts = pd.DataFrame(
+            {"datedir" : datedirs,
+             "ref_hr_string" : ref_hr_strings,
+             "config" : config,
+             "ts_hr_string" : ts_hr_strings,
+             "val_time" : val_times},
+             index = np.arange(n_files)).astype(FILEPARTS_DTYPES)
+        
+    return df_parts
+    
+
+def get_latest_ana_fileparts(start_time, n_hours, ts_int, include_t0, domain):
+    '''
+    Build a dataframe of filename parts, determining which AnA configuration (standard or extended) 
+    is the best/most recent available that corresponds to each valid time in the most recent evaluatable forecast 
+    (e.g. issued 20 hours earlier for short range - 18 hours plus 2 hour latency)
+    
+    *Note currently only works to combine extended and standard AnA for 1-hour timestep
+    '''
+    
+    # get the start datetime of the aligning forecast
+    # include t0 or not based on include_t0 argument
+    if include_t0:
+        end_time = start_time + timedelta(hours=n_hours)
+    else:
+        end_time = start_time + timedelta(hours=n_hours)
+        start_time = start_time + timedelta(hours=1)
+        
+    n_hours_back = n_hours
+    #start_time = end_time - timedelta(hours=n_hours_back)
+
+    # get the valid times (time on the ground) between start_time/end_time
+    # e.g. for comparison to SRF issued 18-hrs prior, get ref_time (18 hours ago) plus 18 hours
+    val_times = pd.date_range(start=start_time, end=end_time, freq='H')    
+
+    # get number of datetimes (number of filenames being generated)
+    n_files = len(val_times)
+    
+    # filename parts are filled in arrays, then the dataframe is built once
+    datedirs = np.empty(n_files, dtype = object)
+    ref_hr_strings = np.empty(n_files, dtype = object)
+    configs = np.empty(n_files, dtype = object)
+    ts_hr_strings = np.empty(n_files, dtype = object)
+    
+    # last 3 files are always most recent standard AnA (tm02, tm01, tm00 of the end time)
+    last = np.arange(max(n_files-3, 0), n_files)
+    datedirs[last] = format_datedir(end_time)
+    ref_hr_strings[last] = 't' + format_ref_hr(end_time)
+    ts_hr_strings[last] = [f'tm{n_files - i - 1:02d}' for i in last]
+    configs[last] = 'analysis_assim'
+        
+    # the algorithm below determines which timesteps have an extended AnA value available
+    #       for the valid time and which have only standard available
+    #       and determines which set of output (which date for extana) the valid time is part of
+    
+    # starting with 4th to last timestep (prior to most recent std AnA run), work backwards
+    n_back = n_files - 3
+    if n_back > 0:
+    
+        # ivts short for valid times (in backward order, k steps back)
+        ivts = val_times[:n_back][::-1]
+        k = np.arange(n_back)
+        
+        # once the valid time hour hits 16, the last run ext-ana is available for all prior times 
+        hits = np.flatnonzero(ivts.hour == 16)
+        switch = hits[0] if len(hits) else n_back
+        is_ext = k >= switch
+        
+        # timestep hour of extended counts up from 0 at the switch - after tm27, switches dates and 
+        # continues from tm04
+        m = k - switch
+        ext_ts_hour = np.where(m <= 27, m, 4 + (m - 28) % 24)
+        
+        # if the valid time is pulling from standard, use tm02 from ref time 2 hours ahead
+        # currently hard-coded here to use tm02 only for all timesteps prior to most recent avail std AnA
+        # if pulling from an extended ana run, use the 16z run of the same day (tm16-tm00), 
+        # or the next day (tm27-tm17)
+        std_times = ivts + pd.Timedelta(hours = 2)
+        ext_times = ivts.normalize() + pd.to_timedelta(np.where(ext_ts_hour < 17, 16, 40), unit = 'h')
+        data_times = pd.DatetimeIndex(np.where(is_ext, ext_times.to_numpy(), std_times.to_numpy()))
+        
+        back_configs = np.where(is_ext, 'analysis_assim_extend', 'analysis_assim')
+        back_ts_hr_strings = [f'tm{hr:02d}' if ext else 'tm02' for hr, ext in zip(ext_ts_hour, is_ext)]
+                
+        # update filename parts (back in forward order)
+        configs[:n_back] = back_configs[::-1]
+        ts_hr_strings[:n_back] = back_ts_hr_strings[::-1]
+        datedirs[:n_back] = data_times.strftime("nwm.%Y%m%d")[::-1]
+        ref_hr_strings[:n_back] = ('t' + data_times.strftime("%Hz"))[::-1]
+        
+    # build the filename parts dataframe
+    df_parts = pd.DataFrame(
+            {"datedir" : datedirs,
+             "ref_hr_string" : ref_hr_strings,
+             "config" : configs,
+             "ts_hr_string" : ts_hr_strings,
+             "val_time" : val_times},
+             index = np.arange(n_files)).astype(FILEPARTS_DTYPES)
+                
+    return df_parts
+   
+
+def get_simple_ana_fileparts(ref_time, config, n_hours, ts_int):
+    '''
+    straightforward filenames for all timesteps of a given AnA config
+    '''   
+    
+    # the tm strings built here are whole hours only (no minutes, e.g. hawaii 15-min AnA)
+    if ts_int % 1 > 0:
+        raise ValueError(f'Timestep interval of {ts_int} hours not supported, must be whole hours')
+    
+    # timestep hours (0 through n_hours, incrementing by ts_int)
+    ts_hr = np.arange(0, n_hours, ts_int)
+
+    # date directory, reference time string and valid time are the same for all files
+    df_parts = pd.DataFrame(
+            {"datedir" : format_datedir(ref_time),
+             "ref_hr_string" : 't' + format_ref_hr(ref_time),
+             "config" : config,
+             "ts_hr_string" : np.char.add("tm", np.char.zfill(ts_hr.astype(str), 2)),
+             "val_time" : ref_time},
+             index = np.arange(len(ts_hr))).astype(FILEPARTS_DTYPES)
+
+    df_parts = df_parts.iloc[::-1]
+
+    return df_parts 
+    
+    
+def add_no_da_to_filelist(filelist):
+    '''
+    Add the 'no_da' extension to the config directory and filename for a list of filepaths
+    '''    
+    
+    new_filelist = []
+    
+    if filelist:
+        for path in filelist:
+        
+            parts = path.name.split(".")
+            parts[2] = parts[2] + "_no_da"
+            new_filename = ".".join(parts)
+            
+            new_path = path.parent.parent / (path.parent.name + '_no_da') / new_filename
+            
+            new_filelist.append(new_path)
+
+    return new_filelist 
+    
+def get_filelist_chunks_by_df(df_filelists, n = 24, include_t0 = True):
+    '''
+    run the filelist chunker for multiple filelists
+    '''
+    
+    # collect the chunks of each filelist, then build the chunks column once
+    records = []
+    for filelist in df_filelists['filelist']:
+    
+        filelist_chunks, n_chunks = get_filelist_chunks(filelist, n, include_t0 = include_t0)
+        records.append(filelist_chunks)
+        
+    df_filelists_chunks = pd.DataFrame({'filelist_chunks' : records}, index = df_filelists.index)
+    
+    df_filelists = pd.concat([df_filelists, df_filelists_chunks], axis = 1)
+    
+    return df_filelists, n_chunks
+    
+    
+def get_filelist_chunks(filelist, n = 24, include_t0 = True):
+    '''
+    Split a list of filenames into chunks containing n files each.
+    If include_t0 = True, include a 't0' file (last file from prior chunk) in order to
+       calculate some necessary metrics, e.g., rate of rise
+    '''
+
+    # number of timesteps
+    nts = len(filelist)
+
+    if nts > n:
+    
+        # if include_t0 = True, start chunking at t1 and 
+        # append last timestep of prior chunk to each list;
+        # first chunk will append the true t0  
+        # otherwise start chunking at t0        
+        # (slices are clipped at the end of the list, so the last chunk may be shorter)
+        if include_t0:
+            filelist_chunks = [filelist[i-1:i+n] for i in range(1,nts,n)]                
+        else:        
+            filelist_chunks = [filelist[i:i+n] for i in range(0,nts,n)]
+                     
+        n_chunks = len(filelist_chunks)
+            
+    else:
+    
+        filelist_chunks = [filelist]
+        n_chunks = 1
+
+    return filelist_chunks, n_chunks
+    
+    
+def parse_nwm_filelist(filelist):
+    '''
+    Parse out filename parts from a list of nwm filepaths and store as separate columns in a dataframe
+    '''
+
+    # extract all filename parts in one pass of the filename pattern
+    names = pd.Series([path.name for path in filelist], dtype = object)
+    parts = names.str.extract(NWM_FILENAME_RE.pattern)
+    
+    # names that do not match the pattern are left as NaN rows
+    no_match = parts['ts'].isna().to_numpy()
+    if no_match.any():
+        raise ValueError(f'not an NWM filename: {names[no_match].iloc[0]}')
+    
+    date = pd.Series([path.parents[1].name for path in filelist], dtype = object)
+    reftimes = pd.to_datetime(date + parts['ref_hr'], format = 'nwm.%Y%m%d%H', cache = True)
+    ts = parts['ts']
+    
+    # valid times - AnA timesteps (tm) are hours before the reftime, forecast (f) hours after
+    ts_hours = ts.str.lstrip('tmf').astype(int).to_numpy()
+    hr_add = np.where(ts.str.startswith('tm').to_numpy(), -ts_hours, ts_hours)
+    val_times = reftimes + pd.to_timedelta(hr_add, unit = 'h')
+    
+    df = pd.DataFrame({'reftime' : reftimes.to_numpy(), 
+                       "ts" : ts.to_numpy(), 
+                       'config' : parts['config'].to_numpy(), 
+                       'variable' : parts['variable'].to_numpy(), 
+                       'domain' : parts['domain'].to_numpy(),
+                       'val_time' : val_times.to_numpy()})   
+    
+    return df
+
+
+def get_alt_ana_filelist(filelist):
+    '''
+    switch a filelist from one config (e.g. ExtAnA) for another (AnA) for same valid times
+    '''
+    
+    df = parse_nwm_filelist(filelist)
+    
+    # first check if the filelist contains forecasts or AnA, if not, return empty list
+    config = df.loc[0, 'config']
+    if config in ['short_range','medium_range']:
+        return []
+    
+    # alternate config, and variable group of each file 
+    # (e.g. 'channel_rt_subset' is the 'channel' group, with the subset path added after)
+    df['alt_config'] = df['config'].map({'analysis_assim_extend' : 'analysis_assim',
+                                         'analysis_assim' : 'analysis_assim_extend'})
+    # (any other config has no alternate - fail here rather than return a list with gaps)
+    if df['alt_config'].isna().any():
+        bad_configs = df.loc[df['alt_config'].isna(), 'config'].unique()
+        raise ValueError(f'No alternate AnA config for config(s): {", ".join(bad_configs)}')
+        
+    # (a filelist has only a few distinct variable strings, so work out each once and map)
+    var_groups = {}
+    for var_string in df['variable'].unique():
+        variable = var_string[:-7] if var_string.endswith('subset') else var_string
+        if variable.startswith('channel_rt'):
+            variable = 'channel'
+        var_groups[var_string] = variable
+        
+    is_subset = df['variable'].str.endswith('subset').to_numpy()
+    df['variable'] = df['variable'].map(var_groups)
+    
+    version = admin.nwm_version(df.loc[0, 'val_time'])
+    domain = df.loc[0, 'domain']
+    
+    # build the filelist for all valid times of each alternate config/variable at once,
+    # placing the files back in the original order
+    filelist_alt = [None] * len(df)
+    for (alt_config, variable), rows in df.groupby(['alt_config', 'variable'], sort = False).indices.items():
+    
+        val_times = pd.DatetimeIndex(df['val_time'].to_numpy()[rows])
+        n_files = len(rows)
+        
+        df_parts = get_ana_fileparts(val_times[0], alt_config, n_files, 1, True, val_times = val_times)
+        filenames = build_filelist_from_parts(domain, version, alt_config, variable, df_parts)
+        
+        for row, filename in zip(rows, filenames):
+            filelist_alt[row] = filename
+            
+    filelist_alt = [raw.get_subset_path(filename) if subset else filename 
+                    for filename, subset in zip(filelist_alt, is_subset)]
+    
+    return filelist_alt
+
+    
+    
+def parse_nwm_path(nwm_path):
+    '''
+    Parse out filename parts from a single nwm filepath
+    '''
+
+    parts = NWM_FILENAME_RE.match(nwm_path.name)
+    if parts is None:
+        raise ValueError(f'not an NWM filename: {nwm_path.name}')
+    
+    date = nwm_path.parents[1].name
+    ref_time = datetime.strptime(date + parts['ref_hr'], 'nwm.%Y%m%d%H')
+    ts = parts['ts']
+    config = parts['config']
+    
+    return ref_time, ts, config
+    
+
+def parse_ts_from_path(nwm_path):
+    '''
+    Parse out timestep number as integer for the file with index i
+    '''
+
+    ref_time, ts, config = parse_nwm_path(nwm_path)
+    
+    if ts[0] == 't':    # tmxx
+        t = -1 * int(ts[2:])
+    else:               # fxxx
+        t = int(ts[1:])
+
+    return t
+    
+    
+def parse_valtime_from_path(nwm_path):
+    '''
+    Parse out timestep number as integer for the file with index i
+    '''
+
+    ref_time, ts, config = parse_nwm_path(nwm_path)
+    
+    if ts[0] == 't':    # tmxx
+        t = -1 * int(ts[2:])
+    else:               # fxxx
+        t = int(ts[1:])
+        
+    val_time = ref_time + timedelta(hours = t)        
+
+    return val_time